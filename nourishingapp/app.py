@@ -1,32 +1,192 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session
+from flask import Flask, Blueprint, abort, current_app, has_request_context, render_template, request, redirect, url_for, flash, session, g, jsonify, send_file, send_from_directory, Response, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, logout_user, current_user, login_required
-from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime
+from werkzeug.security import generate_password_hash
+from datetime import datetime, timedelta
 import os
-from flask_admin import Admin
+import time
+import atexit
+import click
+import re
+import json
+import csv
+import io
+import zlib
+import base64
+import functools
+import itertools
+import hashlib
+import mimetypes
+import statistics
+import subprocess
+import sys
+import threading
+from types import SimpleNamespace
+from flask_admin import Admin, BaseView, expose
 from flask_admin.contrib.sqla import ModelView
+from flask_admin.contrib.sqla.filters import (BaseSQLAFilter, DateTimeBetweenFilter, DateTimeGreaterFilter,
+                                              DateTimeSmallerFilter, FilterEqual)
+from flask_migrate import Migrate
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from werkzeug.http import is_resource_modified
+from archive import HistoryArchive
+from assets import AssetManifest, build as build_static_assets, tree_fingerprint
+import bulk_content
+from content_cache import ContentCache
+from group_commit import GroupCommitWriter
+from password_hashing import PasswordHasher, HasherBusy
+from request_profiler import RequestProfiler, server_timing
+import search_index
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = 'your-secret-key-change-this-in-production'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///nest_nourish.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+DEFAULT_CONFIG = {
+    'SECRET_KEY': 'your-secret-key-change-this-in-production',
+    'SQLALCHEMY_DATABASE_URI': 'sqlite:///nest_nourish.db',
+    'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+    'SQLITE_WAL': True,  # write-ahead log: readers and the writer don't block each other
+    'SQLITE_SYNCHRONOUS': 'NORMAL',  # with WAL, only a power cut (not a crash) can lose the last commits
+    'SQLITE_BUSY_TIMEOUT': 5000,  # ms a write waits for the lock before failing with "database is locked"
+    'WRITE_BATCH_WINDOW': 1,  # ms to gather concurrent log writes into one commit; 0 commits per request
+    'WRITE_BATCH_MAX': 64,  # writes per group commit
+    'WRITE_TIMEOUT': 10,  # seconds queued writes get to commit at exit; requests wait for their commit however long it takes
+    'ADMIN_ENABLED': True,  # False skips building the Flask-Admin views, e.g. for API-only workers
+    'ADMIN_COUNT_LIMIT': 10000,  # admin log lists count matching rows up to this many, then show "10,000+"
+    'ADMIN_COUNT_TTL': 60,  # seconds an admin list's row count is reused
+    'CONTENT_CACHE_SIZE': 256,  # max cached content queries per worker
+    'CONTENT_CACHE_TTL': 300,  # seconds
+    'IDENTITY_SNAPSHOT_TTL': 300,  # seconds a session identity is trusted without a query
+    'SYNC_MAX_ENTRIES': 1000,  # entries accepted per /sync request
+    'EXPORT_BATCH_SIZE': 1000,  # rows fetched per round trip while streaming exports
+    'HISTORY_PAGE_SIZE': 20,
+    'HISTORY_MAX_PAGE_SIZE': 100,
+    'PASSWORD_HASH_METHOD': 'scrypt:32768:8:1',  # stored hashes using other parameters are upgraded on login
+    'PASSWORD_HASH_WORKERS': 2,  # hashing processes per app process; 0 hashes inline
+    'PASSWORD_HASH_MAX_PENDING': 32,  # queued hashing jobs before logins get a 503
+    'PASSWORD_HASH_TIMEOUT': 10,  # seconds
+    'TREND_CACHE_SIZE': 512,  # cached per-user wellness trend results per worker
+    'TREND_CACHE_TTL': 3600,  # seconds; entries are also dropped as soon as the user logs wellness
+    'TREND_HISTORY_DAYS': 365,  # how far back wellness trends look
+    'TREND_ROLLING_DAYS': 7,
+    'PROFILER_ENABLED': True,  # per-endpoint timing and SQL stats, shown at /admin/performance/
+    'PROFILER_WINDOW': 500,  # most recent requests per endpoint kept for percentiles
+    'PROFILER_SLOW_STATEMENTS': 10,
+    'PROFILER_REPEAT_THRESHOLD': 3,  # same statement this often in one request is flagged as N+1
+    'PROFILER_SERVER_TIMING': True,  # add a Server-Timing header to admins' responses
+    'ASSET_MAX_AGE': 31536000,  # seconds; fingerprinted files never change under the same name
+    'SEARCH_PAGE_SIZE': 20,
+    'SEARCH_MAX_PAGE_SIZE': 50,
+    'SEARCH_CACHE_SIZE': 1024,  # cached search result pages per worker, dropped on content edits
+    'SEARCH_CACHE_TTL': 300,  # seconds
+    'CONTENT_IMPORT_CHUNK_SIZE': 2000,  # rows upserted per statement pair by bulk content imports
+    'RECOMMENDATION_TOP_K': 6,  # videos stored per user
+    'RECOMMENDATION_BATCH_SIZE': 1000,  # users scored per transaction
+    'ARCHIVE_PATH': 'nest_nourish_archive.db',  # cold history file, relative to the instance folder
+    'ARCHIVE_AFTER_DAYS': 400,  # log rows older than this are archived; never less than TREND_HISTORY_DAYS
+    'ARCHIVE_BATCH_SIZE': 5000,  # rows moved per transaction
+}
 
-db = SQLAlchemy(app)
-login_manager = LoginManager(app)
-login_manager.login_view = 'login'
+db = SQLAlchemy()
+migrate = Migrate()
+login_manager = LoginManager()
+login_manager.login_view = 'main.login'
+# cli_group=None puts the blueprint's commands at the top level (flask seed, ...)
+bp = Blueprint('main', __name__, cli_group=None)
+
+# The FTS index isn't a model; create it (and its triggers) alongside the tables
+@event.listens_for(db.metadata, 'after_create')
+def create_search_index(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        search_index.create_index(connection)
+
+@event.listens_for(db.metadata, 'before_drop')
+def drop_search_index(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        search_index.drop_index(connection)
+
+# ProgressEntry.exercise_type copies its exercise's type, so the admin list can
+# filter on it through an index; triggers keep it right however rows are written
+PROGRESS_EXERCISE_TYPE_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS progress_entry_exercise_type_insert AFTER INSERT ON progress_entry BEGIN
+        UPDATE progress_entry SET exercise_type = (SELECT exercise_type FROM exercise WHERE id = new.exercise_id)
+        WHERE id = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS progress_entry_exercise_type_update AFTER UPDATE OF exercise_id ON progress_entry BEGIN
+        UPDATE progress_entry SET exercise_type = (SELECT exercise_type FROM exercise WHERE id = new.exercise_id)
+        WHERE id = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS exercise_exercise_type_update AFTER UPDATE OF exercise_type ON exercise BEGIN
+        UPDATE progress_entry SET exercise_type = new.exercise_type WHERE exercise_id = new.id;
+    END
+    """,
+)
+
+@event.listens_for(db.metadata, 'after_create')
+def create_progress_triggers(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        for statement in PROGRESS_EXERCISE_TYPE_TRIGGERS:
+            connection.exec_driver_sql(statement)
 
 # User loader for Flask-Login
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return db.session.get(User, int(user_id))
+
+# Fields copied into the session so most pages never need to load the User row
+IDENTITY_FIELDS = ('id', 'username', 'full_name', 'postpartum_months', 'is_admin')
+
+class Identity:
+    """Lightweight stand-in for the logged-in User built from the session."""
+    def __init__(self, **fields):
+        for name in IDENTITY_FIELDS:
+            setattr(self, name, fields.get(name))
+
+def remember_identity(user):
+    """Store a snapshot of the user in the (signed) session cookie."""
+    snapshot = {name: getattr(user, name) for name in IDENTITY_FIELDS}
+    session['identity'] = dict(snapshot, issued_at=time.time())
+    g.identity = Identity(**snapshot)
+    return g.identity
+
+def current_identity():
+    """Resolve the logged-in user once per request.
+
+    Flask-Login's session entry is the single source of auth state. While the
+    identity snapshot is younger than IDENTITY_SNAPSHOT_TTL it is used as-is;
+    otherwise the User row is loaded through Flask-Login (one query, shared with
+    any later use of current_user) and the snapshot is refreshed.
+    """
+    if 'identity' in g:
+        return g.identity
+    g.identity = None
+    user_id = session.get('_user_id')
+    if user_id is None:
+        return None
+
+    snapshot = session.get('identity')
+    if (snapshot and snapshot.get('id') == int(user_id)
+            and time.time() - snapshot.get('issued_at', 0) < current_app.config['IDENTITY_SNAPSHOT_TTL']):
+        g.identity = Identity(**snapshot)
+    elif current_user.is_authenticated:
+        remember_identity(current_user)
+    return g.identity
+
+@bp.app_context_processor
+def inject_identity():
+    # Replaces Flask-Login's context processor, which loads the User on every
+    # render; the proxy only does so for templates that actually use it
+    return {'identity': current_identity(), 'current_user': current_user}
 
 # Database Models
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    password_hash = db.Column(db.String(120), nullable=False)
+    password_hash = db.Column(db.String(255), nullable=False)
     full_name = db.Column(db.String(100), nullable=False)
     date_joined = db.Column(db.DateTime, default=datetime.utcnow)
     postpartum_months = db.Column(db.Integer, default=0)
@@ -37,6 +197,13 @@ class User(UserMixin, db.Model):
     wellness_entries = db.relationship('WellnessEntry', backref='user', lazy=True)
     progress_entries = db.relationship('ProgressEntry', backref='user', lazy=True)
 
+    __table_args__ = (
+        db.Index('ix_user_date_joined_id', date_joined, id),  # admin list
+    )
+
+    def __str__(self):
+        return self.username  # shown in the admin's user pickers
+
 class Exercise(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -45,6 +212,13 @@ class Exercise(db.Model):
     date_completed = db.Column(db.DateTime, default=datetime.utcnow)
     notes = db.Column(db.Text)
 
+    __table_args__ = (
+        db.Index('ix_exercise_user_id_date_completed_id', user_id, date_completed.desc(), id.desc()),
+        db.Index('ix_exercise_user_id', user_id),  # (user_id, id) order for exports
+        db.Index('ix_exercise_date_completed_id', date_completed, id),  # admin list
+        db.Index('ix_exercise_exercise_type_date_completed_id', exercise_type, date_completed, id),
+    )
+
 class WellnessEntry(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -54,6 +228,12 @@ class WellnessEntry(db.Model):
     notes = db.Column(db.Text)
     date_recorded = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_wellness_entry_user_id_date_recorded_id', user_id, date_recorded.desc(), id.desc()),
+        db.Index('ix_wellness_entry_user_id', user_id),  # (user_id, id) order for exports
+        db.Index('ix_wellness_entry_date_recorded_id', date_recorded, id),  # admin list
+    )
+
 class Tip(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
@@ -62,6 +242,10 @@ class Tip(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)
 
+    __table_args__ = (
+        db.Index('ix_tip_title', title),  # natural key for bulk imports
+    )
+
     def __repr__(self):
         return f"Tip('{self.title}', '{self.category}')"
 
@@ -71,6 +255,10 @@ class MentalTip(db.Model):
     tip_content = db.Column(db.Text, nullable=False)
     date_created = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_mental_tip_month_relation', month_relation),
+    )
+
 class RecoveryTip(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
@@ -79,6 +267,11 @@ class RecoveryTip(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)
 
+    __table_args__ = (
+        db.Index('ix_recovery_tip_is_active_recovery_stage', is_active, recovery_stage),
+        db.Index('ix_recovery_tip_title', title),
+    )
+
 class MentalWellnessResource(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
@@ -88,6 +281,11 @@ class MentalWellnessResource(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)
 
+    __table_args__ = (
+        db.Index('ix_mental_wellness_resource_is_active', is_active),
+        db.Index('ix_mental_wellness_resource_title', title),
+    )
+
 class ExerciseVideo(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     exercise_type = db.Column(db.String(100), nullable=False)
@@ -99,6 +297,17 @@ class ExerciseVideo(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_exercise_video_is_active_exercise_type', is_active, exercise_type),
+        db.Index('ix_exercise_video_title', title),
+    )
+
+class ContentVersion(db.Model):
+    """Single-row counter bumped whenever an admin edits content."""
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime)  # Last-Modified of the content pages
+
 class ProgressEntry(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -108,37 +317,824 @@ class ProgressEntry(db.Model):
     difficulty_felt = db.Column(db.Integer, nullable=False)  # 1-10 scale
     notes = db.Column(db.Text)
     date_recorded = db.Column(db.DateTime, default=datetime.utcnow)
+    exercise_type = db.Column(db.String(100))  # the exercise's, set by PROGRESS_EXERCISE_TYPE_TRIGGERS
     
     exercise = db.relationship('Exercise', backref='progress_entries')
 
+    __table_args__ = (
+        db.Index('ix_progress_entry_user_id_date_recorded_id', user_id, date_recorded.desc(), id.desc()),
+        db.Index('ix_progress_entry_user_id', user_id),  # (user_id, id) order for exports
+        db.Index('ix_progress_entry_exercise_id', exercise_id),
+        db.Index('ix_progress_entry_date_recorded_id', date_recorded, id),  # admin list
+        db.Index('ix_progress_entry_exercise_type_date_recorded_id', exercise_type, date_recorded, id),
+    )
+
+class SyncReceipt(db.Model):
+    """Idempotency record for an entry uploaded through /sync."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    idempotency_key = db.Column(db.String(64), nullable=False)
+    entry_type = db.Column(db.String(20), nullable=False)  # exercise, wellness or progress
+    entry_id = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'idempotency_key', name='uq_sync_receipt_user_id_idempotency_key'),
+    )
+
+class UserStats(db.Model):
+    """Per-user rollup maintained alongside every logged entry."""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    exercise_count = db.Column(db.Integer, nullable=False, default=0)
+    total_minutes = db.Column(db.Integer, nullable=False, default=0)
+    wellness_count = db.Column(db.Integer, nullable=False, default=0)
+    progress_count = db.Column(db.Integer, nullable=False, default=0)
+    last_activity_at = db.Column(db.DateTime)
+    last_active_date = db.Column(db.Date)
+    current_streak = db.Column(db.Integer, nullable=False, default=0)  # consecutive active days ending at last_active_date
+    longest_streak = db.Column(db.Integer, nullable=False, default=0)
+
+    user = db.relationship('User', backref=db.backref('stats', uselist=False))
+
+    __table_args__ = (
+        db.Index('ix_user_stats_last_activity_at_user_id', last_activity_at, user_id),  # admin list
+    )
+
+    @property
+    def active_streak(self):
+        """Current streak, or 0 once a full day has passed without activity."""
+        if self.last_active_date and self.last_active_date >= datetime.utcnow().date() - timedelta(days=1):
+            return self.current_streak
+        return 0
+
+class VideoRecommendation(db.Model):
+    """One of a user's precomputed top exercise videos, see refresh_recommendations()."""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True, autoincrement=False)  # 1 = best
+    video_id = db.Column(db.Integer, db.ForeignKey('exercise_video.id'), nullable=False)
+    score = db.Column(db.Float, nullable=False)
+    reason = db.Column(db.String(150), nullable=False)
+    computed_at = db.Column(db.DateTime, nullable=False)
+
+    video = db.relationship('ExerciseVideo')
+
+class RecommendationState(db.Model):
+    """The inputs a user's stored recommendations were computed from."""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    progress_count = db.Column(db.Integer, nullable=False)
+    postpartum_months = db.Column(db.Integer, nullable=False)
+    content_version = db.Column(db.Integer, nullable=False)
+    computed_at = db.Column(db.DateTime, nullable=False)
+
+def record_activity(user_id, *times, exercises=0, minutes=0, wellness=0, progress=0):
+    """Fold newly logged entries into the user's rollup; the caller commits.
+
+    times are the entries' timestamps (default: now). Days at or before the
+    last recorded active day don't move the streak; rebuild_user_stats() does.
+    """
+    times = sorted(times) or [datetime.utcnow()]
+    stats = db.session.get(UserStats, user_id)
+    if stats is None:
+        stats = UserStats(user_id=user_id, exercise_count=0, total_minutes=0,
+                          wellness_count=0, progress_count=0,
+                          current_streak=0, longest_streak=0)
+        db.session.add(stats)
+        db.session.flush()
+
+    # Counters are applied as SQL expressions so concurrent writers don't lose updates
+    stats.exercise_count = UserStats.exercise_count + exercises
+    stats.total_minutes = UserStats.total_minutes + minutes
+    stats.wellness_count = UserStats.wellness_count + wellness
+    stats.progress_count = UserStats.progress_count + progress
+
+    for when in times:
+        day = when.date()
+        if stats.last_active_date is None or day > stats.last_active_date:
+            if stats.last_active_date == day - timedelta(days=1):
+                stats.current_streak += 1
+            else:
+                stats.current_streak = 1
+            stats.longest_streak = max(stats.longest_streak, stats.current_streak)
+            stats.last_active_date = day
+    if stats.last_activity_at is None or times[-1] > stats.last_activity_at:
+        stats.last_activity_at = times[-1]
+    return stats
+
+def commit_write(write):
+    """Run write(), which adds rows to db.session, and commit it.
+
+    With WRITE_BATCH_WINDOW set, writes from concurrent requests are
+    committed together by the app's GroupCommitWriter. Either way this
+    returns write()'s result only once it's committed.
+    """
+    return current_app.extensions['db_writer'].submit(write)
+
+def _streaks(days):
+    """Return (streak ending at the last day, longest streak) for sorted dates."""
+    current = longest = 0
+    previous = None
+    for day in days:
+        current = current + 1 if previous == day - timedelta(days=1) else 1
+        longest = max(longest, current)
+        previous = day
+    return current, longest
+
+def rebuild_user_stats():
+    """Recompute every UserStats row from the history tables and the archive."""
+    rows = {}
+
+    def bucket(user_id):
+        return rows.setdefault(user_id, {'user_id': user_id, 'exercise_count': 0, 'total_minutes': 0,
+                                         'wellness_count': 0, 'progress_count': 0,
+                                         'last_activity_at': None, 'days': set()})
+
+    def last(current, value):
+        return value if current is None or (value is not None and value > current) else current
+
+    totals = [
+        (Exercise, Exercise.date_completed, 'exercise_count', db.func.sum(Exercise.duration)),
+        (WellnessEntry, WellnessEntry.date_recorded, 'wellness_count', None),
+        (ProgressEntry, ProgressEntry.date_recorded, 'progress_count', None),
+    ]
+    for model, date_column, count_key, minutes in totals:
+        columns = [model.user_id, db.func.count(model.id), db.func.max(date_column)]
+        if minutes is not None:
+            columns.append(minutes)
+        for row in db.session.query(*columns).group_by(model.user_id):
+            stats = bucket(row[0])
+            stats[count_key] = row[1]
+            stats['last_activity_at'] = last(stats['last_activity_at'], row[2])
+            if minutes is not None:
+                stats['total_minutes'] = row[3] or 0
+
+        day = db.func.date(date_column)
+        for user_id, active_day in db.session.query(model.user_id, day).filter(date_column.isnot(None)).distinct():
+            bucket(user_id)['days'].add(datetime.strptime(active_day, '%Y-%m-%d').date())
+
+    # Archived history, from the archive's per-chunk summaries
+    count_keys = {'exercise': 'exercise_count', 'wellness': 'wellness_count', 'progress': 'progress_count'}
+    for kind, user_id, count, minutes, last_at, days in current_app.extensions['history_archive'].user_totals():
+        stats = bucket(user_id)
+        stats[count_keys[kind]] += count
+        stats['total_minutes'] += minutes
+        stats['last_activity_at'] = last(stats['last_activity_at'], last_at)
+        stats['days'] |= days
+
+    mappings = []
+    for stats in rows.values():
+        days = sorted(stats.pop('days'))
+        stats['current_streak'], stats['longest_streak'] = _streaks(days)
+        stats['last_active_date'] = days[-1] if days else None
+        mappings.append(stats)
+
+    UserStats.query.delete()
+    db.session.bulk_insert_mappings(UserStats, mappings)
+    db.session.commit()
+    return len(mappings)
+
+@bp.cli.command('rebuild-user-stats')
+def rebuild_user_stats_command():
+    """Backfill the UserStats rollup from the full history."""
+    click.echo(f'Rebuilt statistics for {rebuild_user_stats()} user(s).')
+
+def recovery_stage(postpartum_months):
+    if (postpartum_months or 0) <= 3:
+        return 'Early'
+    elif postpartum_months <= 12:
+        return 'Mid'
+    return 'Late'
+
+def refresh_recommendations(full=False):
+    """Recompute stored video recommendations; returns the number of users rescored.
+
+    Only users whose inputs changed since their last run are scored: new
+    progress feedback (seen through UserStats.progress_count), a new
+    postpartum month or an edit to the video catalog. full=True rescores
+    everyone, e.g. after progress entries were edited through the admin.
+    Pages only ever read the stored results, see user_recommendations().
+    """
+    import recommendations  # NumPy, only needed by the batch job
+
+    version = db.session.query(ContentVersion.version).filter_by(id=1).scalar() or 0
+    videos = (db.session.query(ExerciseVideo.id, ExerciseVideo.exercise_type, ExerciseVideo.difficulty_level)
+              .filter_by(is_active=True).order_by(ExerciseVideo.id).all())
+    type_positions = {}
+    for video in videos:
+        type_positions.setdefault(video.exercise_type, len(type_positions))
+    video_types = [type_positions[video.exercise_type] for video in videos]
+    video_levels = [recommendations.LEVELS.get(video.difficulty_level, 0) for video in videos]
+    other_types = len(type_positions)  # feedback on types without videos still sets the difficulty target
+
+    progress_count = db.func.coalesce(UserStats.progress_count, 0)
+    months = db.func.coalesce(User.postpartum_months, 0)
+    query = (db.session.query(User.id, months, progress_count)
+             .outerjoin(UserStats, UserStats.user_id == User.id)
+             .outerjoin(RecommendationState, RecommendationState.user_id == User.id))
+    if not full:
+        query = query.filter(db.or_(RecommendationState.user_id.is_(None),
+                                    RecommendationState.progress_count != progress_count,
+                                    RecommendationState.postpartum_months != months,
+                                    RecommendationState.content_version != version))
+    users = query.order_by(User.id).all()
+
+    batch_size = current_app.config['RECOMMENDATION_BATCH_SIZE']
+    for start in range(0, len(users), batch_size):
+        batch = users[start:start + batch_size]
+        ids = [user_id for user_id, _, _ in batch]
+        user_positions = {user_id: position for position, user_id in enumerate(ids)}
+        feedback = [
+            (user_positions[user_id], type_positions.get(exercise_type, other_types), *sums)
+            for user_id, exercise_type, *sums in db.session.query(
+                ProgressEntry.user_id, Exercise.exercise_type, db.func.count(ProgressEntry.id),
+                db.func.sum(ProgressEntry.performance_rating), db.func.sum(ProgressEntry.energy_level),
+                db.func.sum(ProgressEntry.difficulty_felt))
+            .join(Exercise, Exercise.id == ProgressEntry.exercise_id)
+            .filter(ProgressEntry.user_id.in_(ids))
+            .group_by(ProgressEntry.user_id, Exercise.exercise_type)
+        ]
+        feedback += [
+            (user_positions[user_id], type_positions.get(exercise_type, other_types), *sums)
+            for user_id, exercise_type, *sums in current_app.extensions['history_archive'].progress_feedback(ids)
+        ]
+        stages = [recovery_stage(months) for _, months, _ in batch]
+        top, scores, tried = recommendations.recommend(
+            [recommendations.STAGE_TARGETS[stage] for stage in stages],
+            [recommendations.STAGE_MAX_LEVELS[stage] for stage in stages],
+            feedback, video_types, video_levels, current_app.config['RECOMMENDATION_TOP_K'])
+
+        now = datetime.utcnow()
+        rows = []
+        for position, (user_id, months, count) in enumerate(batch):
+            picks = [(videos[index], score, from_feedback)
+                     for index, score, from_feedback in zip(top[position], scores[position], tried[position])
+                     if score > 0]
+            for rank, (video, score, from_feedback) in enumerate(picks, 1):
+                reason = (f'Based on your {video.exercise_type} feedback' if from_feedback
+                          else f'Suited to {stages[position].lower()} recovery')
+                rows.append(dict(user_id=user_id, rank=rank, video_id=video.id, score=round(float(score), 4),
+                                 reason=reason[:150], computed_at=now))
+        # progress_count was read before the feedback, so entries logged
+        # in between make the next run pick the user up again
+        db.session.execute(db.delete(VideoRecommendation).where(VideoRecommendation.user_id.in_(ids)))
+        db.session.execute(db.delete(RecommendationState).where(RecommendationState.user_id.in_(ids)))
+        if rows:
+            db.session.execute(db.insert(VideoRecommendation), rows)
+        db.session.execute(db.insert(RecommendationState), [
+            dict(user_id=user_id, progress_count=count, postpartum_months=months,
+                 content_version=version, computed_at=now)
+            for user_id, months, count in batch])
+        db.session.commit()
+    return len(users)
+
+@bp.cli.command('refresh-recommendations')
+@click.option('--full', is_flag=True, help='Rescore every user, not just those whose inputs changed.')
+def refresh_recommendations_command(full):
+    """Precompute exercise-video recommendations; meant to run on a schedule."""
+    started = time.perf_counter()
+    count = refresh_recommendations(full)
+    click.echo(f'Refreshed recommendations for {count} user(s) in {time.perf_counter() - started:.2f}s.')
+
+def recommendations_query(user_id):
+    return (db.session.query(VideoRecommendation.reason, VideoRecommendation.computed_at, ExerciseVideo)
+            .join(ExerciseVideo, ExerciseVideo.id == VideoRecommendation.video_id)
+            .filter(VideoRecommendation.user_id == user_id, ExerciseVideo.is_active == True)
+            .order_by(VideoRecommendation.rank))
+
+def user_recommendations(user_id):
+    """The user's stored top videos, best first, read once per request."""
+    if 'recommendations' not in g:
+        g.recommendations = recommendations_query(user_id).all()
+    return g.recommendations
+
+def recommendations_validator(identity):
+    """conditional_page() validator for pages showing the user's recommendations."""
+    rows = user_recommendations(identity.id)
+    computed_at = rows[0].computed_at if rows else None
+    return computed_at and computed_at.isoformat(), computed_at
+
+def bump_content_version():
+    """Invalidate every worker's content cache; takes effect when the caller commits."""
+    now = datetime.utcnow()
+    updated = db.session.execute(
+        db.update(ContentVersion).where(ContentVersion.id == 1)
+        .values(version=ContentVersion.version + 1, updated_at=now))
+    if not updated.rowcount:
+        db.session.add(ContentVersion(id=1, version=1, updated_at=now))
+
+def content_version():
+    """(version, updated_at) of the shared content, read once per request."""
+    if 'content_version' not in g:
+        row = db.session.query(ContentVersion.version, ContentVersion.updated_at).filter_by(id=1).first()
+        g.content_version = (row.version, row.updated_at) if row else (0, None)
+        current_app.extensions['content_cache'].sync_version(g.content_version[0])
+    return g.content_version
+
+# Natural key each content table is upserted on by bulk imports
+CONTENT_IMPORT_KEYS = {
+    'tip': ('title',),
+    'mental_tip': ('month_relation', 'tip_content'),
+    'recovery_tip': ('title',),
+    'mental_wellness_resource': ('title',),
+    'exercise_video': ('title',),
+}
+
+def import_content(table, stream, file_format):
+    """Upsert a CSV or JSON file into a content table, in one transaction.
+
+    Returns the row counts from bulk_content.import_rows(); raises
+    bulk_content.InvalidImport, with nothing written, if any row is invalid.
+    The search index follows through its triggers, and the content caches
+    are invalidated when anything changed.
+    """
+    try:
+        counts = bulk_content.import_rows(
+            db.session.connection(), db.metadata.tables[table], CONTENT_IMPORT_KEYS[table],
+            bulk_content.read_rows(stream, file_format), current_app.config['CONTENT_IMPORT_CHUNK_SIZE'])
+    except Exception:
+        db.session.rollback()
+        raise
+    if counts['inserted'] or counts['updated']:
+        bump_content_version()
+    db.session.commit()
+    return counts
+
+def content_file_format(filename):
+    """csv or json from a file name, or None."""
+    extension = os.path.splitext(filename or '')[1].lower()
+    return {'.csv': 'csv', '.json': 'json', '.ndjson': 'json', '.jsonl': 'json'}.get(extension)
+
+def export_content_response(table, file_format):
+    chunks = bulk_content.export_rows(db.session.connection(), db.metadata.tables[table], file_format,
+                                      current_app.config['EXPORT_BATCH_SIZE'])
+    mimetype = 'text/csv' if file_format == 'csv' else 'application/json'
+    return Response(stream_with_context(chunks), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={table}.{file_format}'})
+
+@bp.cli.command('import-content')
+@click.argument('table', type=click.Choice(sorted(CONTENT_IMPORT_KEYS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'file_format', type=click.Choice(bulk_content.FORMATS),
+              help='File format; by default taken from the extension.')
+def import_content_command(table, path, file_format):
+    """Upsert a CSV or JSON file into a content table."""
+    file_format = file_format or content_file_format(path)
+    if file_format is None:
+        raise click.UsageError('Cannot tell the format from the file name; pass --format.')
+    started = time.perf_counter()
+    with open(path, 'rb') as f:
+        try:
+            counts = import_content(table, f, file_format)
+        except bulk_content.InvalidImport as exc:
+            for row, message in exc.errors:
+                click.echo(f'row {row}: {message}' if row else message, err=True)
+            raise SystemExit(f'{exc}; nothing was imported')
+    click.echo(f'Imported {counts["rows"]} row(s) in {time.perf_counter() - started:.2f}s: '
+               f'{counts["inserted"]} new, {counts["updated"]} updated, {counts["unchanged"]} unchanged.')
+
+@bp.cli.command('export-content')
+@click.argument('table', type=click.Choice(sorted(CONTENT_IMPORT_KEYS)))
+@click.option('--format', 'file_format', type=click.Choice(bulk_content.FORMATS), default='csv', show_default=True)
+@click.option('--output', type=click.File('w'), default='-', help='Default: standard output.')
+def export_content_command(table, file_format, output):
+    """Write a content table as CSV or JSON, ready for import-content."""
+    for chunk in bulk_content.export_rows(db.session.connection(), db.metadata.tables[table], file_format,
+                                          current_app.config['EXPORT_BATCH_SIZE']):
+        output.write(chunk)
+
+def cached_content(key, loader, ttl=None):
+    """Serve a content query from the in-process cache.
+
+    The shared content version is checked once per request, so admin edits
+    are picked up by every worker on its next request.
+    """
+    content_cache = current_app.extensions['content_cache']
+    content_version()
+
+    def load():
+        rows = loader()
+        # Detach so the cached rows outlive this request's session
+        for row in rows:
+            db.session.expunge(row)
+        return rows
+
+    return content_cache.get_or_load(key, load, ttl)
+
+# Static assets
+@bp.app_template_global()
+def asset_url(filename):
+    """URL of a static file: its fingerprinted copy once ``flask build-assets`` has run."""
+    hashed = current_app.extensions['assets'].lookup(filename)
+    if hashed is None:
+        return url_for('static', filename=filename)
+    return url_for('main.asset', filename=hashed)
+
+@bp.route('/assets/<path:filename>')
+def asset(filename):
+    """Serve a fingerprinted file, precompressed if the client accepts it."""
+    assets = current_app.extensions['assets']
+    if not assets.is_built(filename):
+        abort(404)
+    max_age = current_app.config['ASSET_MAX_AGE']
+    for encoding in ('br', 'gzip'):
+        variant = request.accept_encodings[encoding] and assets.variant(filename, encoding)
+        if variant:
+            response = send_file(variant, max_age=max_age,
+                                 mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+            response.content_encoding = encoding
+            break
+    else:
+        response = send_from_directory(assets.out_dir, filename, max_age=max_age)
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+@bp.cli.command('build-assets')
+def build_assets_command():
+    """Fingerprint and precompress static/ into static/dist/."""
+    manifest = build_static_assets(current_app.static_folder, current_app.extensions['assets'].out_dir)
+    compressed = manifest['compressed']
+    click.echo(f"Built {len(manifest['assets'])} asset(s), version {manifest['version']}, "
+               f"with {compressed['gzip']} gzip and {compressed['br']} brotli variant(s).")
+    if compressed['gzip'] and not compressed['br']:
+        click.echo('Install the brotli package to also write .br variants.')
+
+def page_release():
+    """(templates digest, templates mtime, assets version) this process renders with."""
+    release = current_app.extensions.get('page_release')
+    if release is None:
+        digest, modified = tree_fingerprint(os.path.join(current_app.root_path, current_app.template_folder))
+        release = current_app.extensions['page_release'] = (
+            digest, datetime.utcfromtimestamp(int(modified)), current_app.extensions['assets'].version)
+    return release
+
+def conditional_page(view=None, *, validator=None):
+    """Answer a logged-in user's repeat visits to a content page with 304.
+
+    The ETag covers everything these pages are built from: the URL, the
+    shared content version, the identity snapshot and the templates and
+    assets of this release. Last-Modified is the latest of the content
+    edit, the snapshot and the templates. Both are known before rendering,
+    so revalidating costs the single ContentVersion query. Pages with flash
+    messages waiting are always rendered so the messages get shown.
+
+    Pages built from per-user data too pass validator(identity), returning
+    a JSON-able value for the ETag and a datetime (or None) for
+    Last-Modified: ``@conditional_page(validator=...)``.
+    """
+    if view is None:
+        return functools.partial(conditional_page, validator=validator)
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        identity = current_identity()
+        if identity is None or session.get('_flashes'):
+            return view(*args, **kwargs)
+
+        version, updated_at = content_version()
+        templates, templates_modified, assets_version = page_release()
+        validators = [request.full_path, version, templates, assets_version]
+        validators += [getattr(identity, name) for name in IDENTITY_FIELDS]
+        page_value, page_modified = validator(identity) if validator else (None, None)
+        validators.append(page_value)
+        etag = hashlib.sha256(json.dumps(validators).encode()).hexdigest()[:32]
+        issued_at = session.get('identity', {}).get('issued_at')
+        last_modified = max(filter(None, (updated_at, templates_modified, page_modified,
+                                          issued_at and datetime.utcfromtimestamp(int(issued_at)))))
+
+        if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+            response = current_app.make_response(view(*args, **kwargs))
+        else:
+            response = current_app.response_class(status=304)
+        if response.status_code in (200, 304):
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            response.vary.add('Cookie')
+        return response
+    return wrapper
+
 # Secure admin interface
 class AdminModelView(ModelView):
+    """Admin-only model view whose forms and filters are scaffolded on first use.
+
+    Flask-Admin builds them in the constructor; deferring that keeps it out
+    of create_app() and so out of every worker's cold start. Requests only
+    skip the lock once ``_scaffold_done`` is set, after every cache is built.
+    """
+    _scaffolding = False  # while _handle_view builds the caches, under the lock
+    _scaffold_done = False
+    _scaffold_lock = threading.Lock()
+
+    def is_accessible(self):
+        return current_user.is_authenticated and current_user.is_admin
+
+    def inaccessible_callback(self, name, **kwargs):
+        return redirect(url_for('main.login', next=request.url))
+
+    def _refresh_cache(self):
+        if self._scaffolding or self._scaffold_done:
+            super()._refresh_cache()
+
+    def scaffold_auto_joins(self):
+        # Needs the list columns, which aren't known until scaffolding
+        return super().scaffold_auto_joins() if self._scaffolding or self._scaffold_done else []
+
+    def _handle_view(self, name, **kwargs):
+        if not self.is_accessible():
+            return self.inaccessible_callback(name, **kwargs)
+        if not self._scaffold_done:
+            with self._scaffold_lock:
+                if not self._scaffold_done:
+                    self._scaffolding = True
+                    try:
+                        self._refresh_cache()
+                        if not self.column_select_related_list:
+                            self._auto_joins = self.scaffold_auto_joins()
+                    finally:
+                        self._scaffolding = False
+                    self._scaffold_done = True
+
+class ContentModelView(AdminModelView):
+    """Admin view for content tables served through the content cache.
+
+    Adds bulk CSV/JSON import and export next to the list view's buttons.
+    """
+    list_template = 'admin/content_list.html'
+
+    def on_model_change(self, form, model, is_created):
+        bump_content_version()
+
+    def on_model_delete(self, model):
+        bump_content_version()
+
+    @expose('/import/', methods=('GET', 'POST'))
+    def import_view(self):
+        table = self.model.__tablename__
+        template = dict(key=CONTENT_IMPORT_KEYS[table],
+                        columns=[column.name for column in bulk_content.importable_columns(self.model.__table__)])
+        if request.method == 'POST':
+            upload = request.files.get('file')
+            file_format = request.form.get('format') or content_file_format(upload and upload.filename)
+            if not upload or not upload.filename:
+                flash('Choose a file to import.', 'error')
+            elif file_format not in bulk_content.FORMATS:
+                flash('Cannot tell the format from the file name; choose CSV or JSON.', 'error')
+            else:
+                try:
+                    counts = import_content(table, upload.stream, file_format)
+                except bulk_content.InvalidImport as exc:
+                    return self.render('admin/content_import.html', errors=exc.errors,
+                                       invalid_rows=exc.invalid_rows, filename=upload.filename, **template)
+                flash(f'Imported {counts["rows"]} row(s) from {upload.filename}: {counts["inserted"]} new, '
+                      f'{counts["updated"]} updated, {counts["unchanged"]} unchanged.', 'success')
+                return redirect(self.get_url('.index_view'))
+        return self.render('admin/content_import.html', errors=None, **template)
+
+    @expose('/bulk-export/<file_format>/')
+    def bulk_export_view(self, file_format):
+        if file_format not in bulk_content.FORMATS:
+            abort(404)
+        return export_content_response(self.model.__tablename__, file_format)
+
+class UserFilter(BaseSQLAFilter):
+    """Rows belonging to a username (or user id), looked up through the user_id index."""
+    def apply(self, query, value, alias=None):
+        match = User.username == value
+        if value.isdigit():
+            match = db.or_(match, User.id == int(value))
+        return query.filter(self.column == db.session.query(User.id).filter(match).limit(1).scalar_subquery())
+
+    def operation(self):
+        return 'is'
+
+class LogModelView(AdminModelView):
+    """Admin list for a large table, paged by keyset instead of OFFSET.
+
+    Pages seek past the (sort column, id) of the last row shown, through an
+    index on those columns, so the millionth page costs what the first
+    does. Sorting is limited to indexed columns and the filters to ones an
+    index can serve. The key is the primary key column, the last sort
+    column of every index. The matching-row count is capped at ADMIN_COUNT_LIMIT
+    and reused for ADMIN_COUNT_TTL seconds rather than counted exactly on
+    every page. Relationships shown in the list are joined in the same
+    query (``column_select_related_list``, by name: backrefs only exist
+    once the mappers are configured).
+    """
+    list_template = 'admin/log_list.html'
+    simple_list_pager = True  # no COUNT(*) from Flask-Admin; see approximate_count()
+    page_size = 50
+
+    def get_list(self, page, sort_column, sort_desc, search, filters, execute=True, page_size=None):
+        # page is ignored: the position comes from the after/before cursor
+        if sort_column not in self._sortable_columns:
+            sort_column, sort_desc = self.column_default_sort
+        page_size = page_size or self.page_size
+        key = self._primary_key_column()
+        sort_field = getattr(self.model, sort_column)
+        order = [key] if sort_field is key else [sort_field, key]
+
+        query = self.get_query()
+        if filters and self._filters:
+            query, _, _, _ = self._apply_filters(query, None, {}, {}, filters)
+        if len(order) > 1:
+            query = query.filter(sort_field.isnot(None))  # NULLs have no place in a keyset
+        count = self.approximate_count(query, filters)
+
+        after, before = request.args.get('after'), request.args.get('before')
+        position = self._decode_position(after or before, order)
+        backwards = position is not None and not after
+        descending = bool(sort_desc) != backwards
+        if position is not None:
+            sort_key, cursor = db.tuple_(*order), db.tuple_(*position)
+            query = query.filter(sort_key < cursor if descending else sort_key > cursor)
+        query = query.order_by(*(column.desc() if descending else column for column in order))
+        for relation in self._auto_joins:
+            query = query.options(db.joinedload(getattr(self.model, relation)))
+        rows = query.limit(page_size + 1).all()
+
+        more = len(rows) > page_size
+        rows = rows[:page_size]
+        if backwards:
+            rows.reverse()
+        # Walking backwards, "more" means more rows before these; forwards, after them
+        has_previous = position is not None and (more or not backwards)
+        has_next = more or backwards
+        g.admin_keyset = {
+            'count': count,
+            'count_limit': current_app.config['ADMIN_COUNT_LIMIT'],
+            'first_url': self._position_url() if position is not None else None,
+            'previous_url': self._position_url('before', rows[0], order) if rows and has_previous else None,
+            'next_url': self._position_url('after', rows[-1], order) if rows and has_next else None,
+        }
+        return None, rows
+
+    def _primary_key_column(self):
+        return self.model.__mapper__.primary_key[0]
+
+    def approximate_count(self, query, filters):
+        """Matching rows, counted up to ADMIN_COUNT_LIMIT + 1 and cached per filter set."""
+        limit = current_app.config['ADMIN_COUNT_LIMIT']
+        key = ('admin_count', self.endpoint, tuple((index, repr(value)) for index, _, value in filters or ()))
+        matching = query.with_entities(self._primary_key_column()).limit(limit + 1).subquery()
+        return current_app.extensions['admin_count_cache'].get_or_load(
+            key, lambda: self.session.query(db.func.count()).select_from(matching).scalar())
+
+    def _decode_position(self, cursor, order):
+        # A cursor from another sort order (or a mangled one) starts from the top
+        if not cursor:
+            return None
+        try:
+            values = decode_cursor(cursor)
+            if not isinstance(values, list) or len(values) != len(order):
+                return None
+            return [datetime.fromisoformat(value) if isinstance(column.type, db.DateTime) else
+                    column.type.python_type(value) for column, value in zip(order, values)]
+        except (TypeError, ValueError, NotImplementedError):
+            return None
+
+    def _position_url(self, direction=None, row=None, order=()):
+        view_args = self._get_list_extra_args()
+        extra_args = {name: value for name, value in view_args.extra_args.items() if name not in ('after', 'before')}
+        if direction:
+            values = [getattr(row, column.key) for column in order]
+            extra_args[direction] = encode_cursor([value.isoformat() if isinstance(value, datetime) else value
+                                                   for value in values])
+        return self._get_list_url(view_args.clone(page=None, extra_args=extra_args))
+
+    def render(self, template, **kwargs):
+        if template == self.list_template:
+            kwargs['keyset'] = g.pop('admin_keyset', None)
+        return super().render(template, **kwargs)
+
+class UserAdminView(LogModelView):
+    column_list = ('id', 'username', 'email', 'full_name', 'postpartum_months', 'date_joined', 'is_admin',
+                   'stats.exercise_count', 'stats.wellness_count', 'stats.progress_count', 'stats.last_activity_at')
+    column_labels = {'stats.exercise_count': 'Exercises', 'stats.wellness_count': 'Wellness Entries',
+                     'stats.progress_count': 'Progress Entries', 'stats.last_activity_at': 'Last Activity'}
+    column_select_related_list = ('stats',)
+    column_sortable_list = ('id', 'date_joined', 'username')
+    column_default_sort = ('date_joined', True)
+    column_filters = (
+        FilterEqual(User.username, 'Username'),
+        FilterEqual(User.email, 'Email'),
+        DateTimeBetweenFilter(User.date_joined, 'Date Joined'),
+    )
+    # The one-to-many fields would load every logged entry into a select box
+    form_excluded_columns = ('exercises', 'wellness_entries', 'progress_entries', 'stats')
+
+class ExerciseAdminView(LogModelView):
+    column_list = ('id', 'user.username', 'exercise_type', 'duration', 'date_completed', 'notes')
+    column_labels = {'user.username': 'User'}
+    column_select_related_list = ('user',)
+    column_sortable_list = ('id', 'date_completed')
+    column_default_sort = ('date_completed', True)
+    column_filters = (
+        UserFilter(Exercise.user_id, 'User'),
+        FilterEqual(Exercise.exercise_type, 'Exercise Type'),
+        DateTimeBetweenFilter(Exercise.date_completed, 'Date Completed'),
+        DateTimeGreaterFilter(Exercise.date_completed, 'Date Completed'),
+        DateTimeSmallerFilter(Exercise.date_completed, 'Date Completed'),
+    )
+    form_excluded_columns = ('progress_entries',)
+    form_ajax_refs = {'user': {'fields': ('username',)}}
+
+class WellnessEntryAdminView(LogModelView):
+    column_list = ('id', 'user.username', 'mood_rating', 'stress_level', 'sleep_hours', 'date_recorded', 'notes')
+    column_labels = {'user.username': 'User'}
+    column_select_related_list = ('user',)
+    column_sortable_list = ('id', 'date_recorded')
+    column_default_sort = ('date_recorded', True)
+    column_filters = (
+        UserFilter(WellnessEntry.user_id, 'User'),
+        DateTimeBetweenFilter(WellnessEntry.date_recorded, 'Date Recorded'),
+        DateTimeGreaterFilter(WellnessEntry.date_recorded, 'Date Recorded'),
+        DateTimeSmallerFilter(WellnessEntry.date_recorded, 'Date Recorded'),
+    )
+    form_ajax_refs = {'user': {'fields': ('username',)}}
+
+class ProgressEntryAdminView(LogModelView):
+    column_list = ('id', 'user.username', 'exercise_type', 'performance_rating', 'energy_level',
+                   'difficulty_felt', 'date_recorded', 'notes')
+    column_labels = {'user.username': 'User'}
+    column_select_related_list = ('user',)
+    column_sortable_list = ('id', 'date_recorded')
+    column_default_sort = ('date_recorded', True)
+    column_filters = (
+        UserFilter(ProgressEntry.user_id, 'User'),
+        FilterEqual(ProgressEntry.exercise_type, 'Exercise Type'),
+        DateTimeBetweenFilter(ProgressEntry.date_recorded, 'Date Recorded'),
+        DateTimeGreaterFilter(ProgressEntry.date_recorded, 'Date Recorded'),
+        DateTimeSmallerFilter(ProgressEntry.date_recorded, 'Date Recorded'),
+    )
+    form_excluded_columns = ('exercise_type',)  # copied from the exercise
+    form_ajax_refs = {'user': {'fields': ('username',)}, 'exercise': {'fields': ('exercise_type',)}}
+
+class UserStatsAdminView(LogModelView):
+    column_list = ('user_id', 'user.username', 'exercise_count', 'total_minutes', 'wellness_count',
+                   'progress_count', 'last_activity_at', 'current_streak', 'longest_streak')
+    column_labels = {'user_id': 'User Id', 'user.username': 'User'}
+    column_select_related_list = ('user',)
+    column_sortable_list = ('user_id', 'last_activity_at')
+    column_default_sort = ('last_activity_at', True)
+    column_filters = (
+        UserFilter(UserStats.user_id, 'User'),
+        DateTimeBetweenFilter(UserStats.last_activity_at, 'Last Activity'),
+        DateTimeGreaterFilter(UserStats.last_activity_at, 'Last Activity'),
+        DateTimeSmallerFilter(UserStats.last_activity_at, 'Last Activity'),
+    )
+    form_ajax_refs = {'user': {'fields': ('username',)}}
+
+class StatsView(BaseView):
+    """Admin page returning one of this worker's stats() dictionaries as JSON."""
+    def __init__(self, stats, **kwargs):
+        super().__init__(**kwargs)
+        self.stats = stats
+
     def is_accessible(self):
         return current_user.is_authenticated and current_user.is_admin
 
     def inaccessible_callback(self, name, **kwargs):
-        return redirect(url_for('login', next=request.url))
-
-# Initialize Flask-Admin
-admin = Admin(app, name='NourishAdmin', template_mode='bootstrap3')
-admin.add_view(AdminModelView(User, db.session))
-admin.add_view(AdminModelView(Exercise, db.session))
-admin.add_view(AdminModelView(WellnessEntry, db.session))
-admin.add_view(AdminModelView(Tip, db.session))
-admin.add_view(AdminModelView(MentalTip, db.session))
-admin.add_view(AdminModelView(RecoveryTip, db.session))
-admin.add_view(AdminModelView(MentalWellnessResource, db.session))
-admin.add_view(AdminModelView(ExerciseVideo, db.session))
-admin.add_view(AdminModelView(ProgressEntry, db.session))
+        return redirect(url_for('main.login', next=request.url))
+
+    @expose('/')
+    def index(self):
+        return jsonify(self.stats())
+
+class PerformanceView(StatsView):
+    """Request profiler stats per endpoint; ?format=json for the raw numbers."""
+    @expose('/')
+    def index(self):
+        stats = self.stats()
+        if request.args.get('format') == 'json':
+            return jsonify(stats)
+        return self.render('admin/performance.html', stats=stats)
+
+class WellnessCohortView(StatsView):
+    """Wellness trends by postpartum_months cohort; ?format=json for the raw numbers."""
+    @expose('/')
+    def index(self):
+        stats = self.stats()
+        if request.args.get('format') == 'json':
+            return jsonify(stats)
+        return self.render('admin/wellness_cohorts.html', stats=stats)
 
 # Routes
-@app.route('/')
+@bp.route('/')
 def index():
-    if 'user_id' in session:
-        return redirect(url_for('dashboard'))
+    if current_identity():
+        return redirect(url_for('main.dashboard'))
     return render_template('index.html')
 
-@app.route('/register', methods=['GET', 'POST'])
+def store_rehashed_password(app, user_id, old_hash, new_hash):
+    """Swap in an upgraded hash unless the password changed meanwhile."""
+    with app.app_context():
+        db.session.execute(db.update(User).where(User.id == user_id, User.password_hash == old_hash)
+                           .values(password_hash=new_hash))
+        db.session.commit()
+
+@bp.route('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
         username = request.form['username']
@@ -156,118 +1152,149 @@ def register():
             return render_template('register.html')
         
         # Create new user
-        password_hash = generate_password_hash(password)
-        new_user = User(
-            username=username,
-            email=email,
-            password_hash=password_hash,
-            full_name=full_name
-        )
+        try:
+            password_hash = current_app.extensions['password_hasher'].hash(password)
+        except HasherBusy:
+            flash('We are handling a lot of sign-ups right now. Please try again in a moment.', 'warning')
+            return render_template('register.html'), 503, {'Retry-After': '1'}
+        def write():
+            db.session.add(User(
+                username=username,
+                email=email,
+                password_hash=password_hash,
+                full_name=full_name
+            ))
         
-        db.session.add(new_user)
-        db.session.commit()
+        try:
+            commit_write(write)
+        except IntegrityError:
+            # Someone registered the same username or email since the checks above
+            flash('Username or email already registered. Please choose a different one.', 'danger')
+            return render_template('register.html')
         
         flash('Registration successful! Please log in.', 'success')
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     
     return render_template('register.html')
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
         
         user = User.query.filter_by(username=username).first()
+        password_hasher = current_app.extensions['password_hasher']
         
-        if user and check_password_hash(user.password_hash, password):
-            session['user_id'] = user.id
-            session['username'] = user.username
-            session['full_name'] = user.full_name
+        try:
+            valid = user is not None and password_hasher.verify(user.password_hash, password)
+        except HasherBusy:
+            flash('We are handling a lot of sign-ins right now. Please try again in a moment.', 'warning')
+            return render_template('login.html'), 503, {'Retry-After': '1'}
+
+        if valid:
+            if password_hasher.needs_rehash(user.password_hash):
+                password_hasher.rehash_in_background(
+                    password, lambda new_hash, app=current_app._get_current_object(), user_id=user.id,
+                                     old_hash=user.password_hash:
+                        store_rehashed_password(app, user_id, old_hash, new_hash))
             login_user(user)  # Flask-Login
+            remember_identity(user)
             flash(f'Welcome back, {user.full_name}!', 'success')
-            return redirect(url_for('dashboard'))
+            return redirect(url_for('main.dashboard'))
         else:
             flash('Invalid username or password.', 'danger')
     
     return render_template('login.html')
 
-@app.route('/logout')
+@bp.route('/logout')
 def logout():
     logout_user()  # Flask-Login
     session.clear()
     flash('You have been logged out successfully.', 'info')
-    return redirect(url_for('index'))
+    return redirect(url_for('main.index'))
 
-@app.route('/dashboard')
+@bp.route('/dashboard')
 def dashboard():
-    if 'user_id' not in session:
+    if not current_identity():
         flash('Please log in to access the dashboard.', 'warning')
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     
-    user = User.query.get(session['user_id'])
-    if not user:
+    user = current_user._get_current_object()
+    if not user.is_authenticated:
         flash('User not found. Please log in again.', 'danger')
         session.clear()
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     
-    recent_exercises = Exercise.query.filter_by(user_id=user.id).order_by(Exercise.date_completed.desc()).limit(5).all()
-    recent_wellness = WellnessEntry.query.filter_by(user_id=user.id).order_by(WellnessEntry.date_recorded.desc()).limit(3).all()
+    recent_exercises, exercises_cursor = history_page(user.id, 'exercises', 5)
+    recent_wellness, wellness_cursor = history_page(user.id, 'wellness', 3)
     
     # Get personalized tips based on postpartum months
-    wellness_tips = MentalTip.query.filter_by(month_relation=user.postpartum_months).all()
+    wellness_tips = cached_content(('mental_tips', user.postpartum_months),
+                                   MentalTip.query.filter_by(month_relation=user.postpartum_months).all)
     
     return render_template('dashboard.html',
+                         recommendations=user_recommendations(user.id),
                          user=user,
                          exercises=recent_exercises,
+                         exercises_cursor=exercises_cursor,
                          wellness_entries=recent_wellness,
+                         wellness_cursor=wellness_cursor,
                          wellness_tips=wellness_tips)
 
-@app.route('/exercise')
+@bp.route('/exercise')
+@conditional_page(validator=recommendations_validator)
 def exercise():
-    if 'user_id' not in session:
+    if not current_identity():
         flash('Please log in to access this page.', 'warning')
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     
     # Get exercise videos for display
-    exercise_videos = ExerciseVideo.query.filter_by(is_active=True).all()
+    exercise_videos = cached_content('exercise_videos', ExerciseVideo.query.filter_by(is_active=True).all)
     
-    return render_template('exercise.html', exercise_videos=exercise_videos)
+    return render_template('exercise.html', exercise_videos=exercise_videos,
+                           recommendations=user_recommendations(current_identity().id))
 
-@app.route('/log_exercise', methods=['POST'])
+@bp.route('/log_exercise', methods=['POST'])
 def log_exercise():
-    if 'user_id' not in session:
+    if not current_identity():
         if request.is_json or request.headers.get('Content-Type') == 'application/x-www-form-urlencoded':
             return {'success': False, 'error': 'Please log in'}, 401
         flash('Please log in to log exercises.', 'warning')
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     
     exercise_type = request.form['exercise_type']
     duration = int(request.form['duration'])
     notes = request.form.get('notes', '')
     
-    new_exercise = Exercise(
-        user_id=session['user_id'],
-        exercise_type=exercise_type,
-        duration=duration,
-        notes=notes
-    )
+    user_id = current_identity().id
     
-    db.session.add(new_exercise)
-    db.session.commit()
+    def write():
+        new_exercise = Exercise(
+            user_id=user_id,
+            exercise_type=exercise_type,
+            duration=duration,
+            notes=notes
+        )
+        db.session.add(new_exercise)
+        record_activity(user_id, exercises=1, minutes=duration)
+        db.session.flush()
+        return new_exercise.id
+    
+    exercise_id = commit_write(write)
     
     # Check if it's an AJAX request
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest' or 'application/json' in request.headers.get('Accept', ''):
-        return {'success': True, 'exercise_id': new_exercise.id, 'message': 'Exercise logged successfully!'}
+        return {'success': True, 'exercise_id': exercise_id, 'message': 'Exercise logged successfully!'}
     
     flash('Exercise logged successfully!', 'success')
-    return redirect(url_for('exercise'))
+    return redirect(url_for('main.exercise'))
 
-@app.route('/log_progress', methods=['POST'])
+@bp.route('/log_progress', methods=['POST'])
 def log_progress():
-    if 'user_id' not in session:
+    if not current_identity():
         flash('Please log in to log progress.', 'warning')
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     
     exercise_id = int(request.form['exercise_id'])
     performance_rating = int(request.form['performance_rating'])
@@ -275,115 +1302,1004 @@ def log_progress():
     difficulty_felt = int(request.form['difficulty_felt'])
     notes = request.form.get('notes', '')
     
-    new_progress = ProgressEntry(
-        user_id=session['user_id'],
-        exercise_id=exercise_id,
-        performance_rating=performance_rating,
-        energy_level=energy_level,
-        difficulty_felt=difficulty_felt,
-        notes=notes
-    )
+    user_id = current_identity().id
     
-    db.session.add(new_progress)
-    db.session.commit()
+    def write():
+        db.session.add(ProgressEntry(
+            user_id=user_id,
+            exercise_id=exercise_id,
+            performance_rating=performance_rating,
+            energy_level=energy_level,
+            difficulty_felt=difficulty_felt,
+            notes=notes
+        ))
+        record_activity(user_id, progress=1)
+    
+    commit_write(write)
     
     flash('Progress logged successfully!', 'success')
-    return redirect(url_for('exercise'))
+    return redirect(url_for('main.exercise'))
 
-@app.route('/get_exercise_videos/<exercise_type>')
+@bp.route('/get_exercise_videos/<exercise_type>')
+@conditional_page
 def get_exercise_videos(exercise_type):
-    if 'user_id' not in session:
-        return redirect(url_for('login'))
+    if not current_identity():
+        return redirect(url_for('main.login'))
     
-    videos = ExerciseVideo.query.filter_by(exercise_type=exercise_type, is_active=True).all()
+    videos = cached_content(('exercise_videos', exercise_type),
+                            ExerciseVideo.query.filter_by(exercise_type=exercise_type, is_active=True).all)
     return render_template('exercise_videos.html', videos=videos, exercise_type=exercise_type)
 
-@app.route('/recovery')
+@bp.route('/recovery')
+@conditional_page
 def recovery():
-    if 'user_id' not in session:
+    if not current_identity():
         flash('Please log in to access this page.', 'warning')
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     
-    user = User.query.get(session['user_id'])
+    user = current_identity()
     
     # Get recovery tips based on user's postpartum stage
-    if user.postpartum_months <= 3:
-        stage = "Early"
-    elif user.postpartum_months <= 12:
-        stage = "Mid"
-    else:
-        stage = "Late"
+    stage = recovery_stage(user.postpartum_months)
     
-    recovery_tips = RecoveryTip.query.filter_by(recovery_stage=stage, is_active=True).all()
-    all_recovery_tips = RecoveryTip.query.filter_by(is_active=True).all()
+    recovery_tips = cached_content(('recovery_tips', stage),
+                                   RecoveryTip.query.filter_by(recovery_stage=stage, is_active=True).all)
+    all_recovery_tips = cached_content('all_recovery_tips', RecoveryTip.query.filter_by(is_active=True).all)
     
     return render_template('recovery.html', 
                          recovery_tips=recovery_tips, 
                          all_recovery_tips=all_recovery_tips,
                          user=user)
 
-@app.route('/mental_wellness')
+@bp.route('/mental_wellness')
+@conditional_page
 def mental_wellness():
-    if 'user_id' not in session:
+    if not current_identity():
         flash('Please log in to access this page.', 'warning')
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     
-    user = User.query.get(session['user_id'])
-    wellness_resources = MentalWellnessResource.query.filter_by(is_active=True).all()
+    user = current_identity()
+    wellness_resources = cached_content('wellness_resources',
+                                        MentalWellnessResource.query.filter_by(is_active=True).all)
     
     # Get personalized mental tips based on postpartum months
-    mental_tips = MentalTip.query.filter_by(month_relation=user.postpartum_months).all()
+    mental_tips = cached_content(('mental_tips', user.postpartum_months),
+                                 MentalTip.query.filter_by(month_relation=user.postpartum_months).all)
     
     return render_template('mental_wellness.html', 
                          wellness_resources=wellness_resources,
                          mental_tips=mental_tips,
                          user=user)
 
-@app.route('/log_wellness', methods=['POST'])
+@bp.route('/log_wellness', methods=['POST'])
 def log_wellness():
-    if 'user_id' not in session:
+    if not current_identity():
         flash('Please log in to log wellness entries.', 'warning')
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     
     mood_rating = int(request.form['mood_rating'])
     stress_level = int(request.form['stress_level'])
     sleep_hours = float(request.form['sleep_hours']) if request.form['sleep_hours'] else None
     notes = request.form.get('notes', '')
     
-    new_entry = WellnessEntry(
-        user_id=session['user_id'],
-        mood_rating=mood_rating,
-        stress_level=stress_level,
-        sleep_hours=sleep_hours,
-        notes=notes
-    )
+    user_id = current_identity().id
     
-    db.session.add(new_entry)
-    db.session.commit()
+    def write():
+        db.session.add(WellnessEntry(
+            user_id=user_id,
+            mood_rating=mood_rating,
+            stress_level=stress_level,
+            sleep_hours=sleep_hours,
+            notes=notes
+        ))
+        record_activity(user_id, wellness=1)
+    
+    commit_write(write)
+    current_app.extensions['trend_cache'].discard(('user', user_id))
     
     flash('Wellness entry logged successfully!', 'success')
-    return redirect(url_for('mental_wellness'))
+    return redirect(url_for('main.mental_wellness'))
+
+def _int_field(entry, name, low, high, errors, required=True):
+    value = entry.get(name)
+    if value is None or value == '':
+        if required:
+            errors.append(f'{name} is required')
+        return None
+    # int() would truncate 12.7 to 12 and turn true into 1
+    if isinstance(value, bool) or isinstance(value, float) and not value.is_integer():
+        errors.append(f'{name} must be an integer')
+        return None
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        errors.append(f'{name} must be an integer')
+        return None
+    if not low <= value <= high:
+        errors.append(f'{name} must be between {low} and {high}')
+    return value
+
+def _parse_client_timestamp(value, errors):
+    """Parse an ISO 8601 client timestamp into naive UTC, like utcnow() defaults."""
+    if value is None:
+        return datetime.utcnow()
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        errors.append('client_timestamp must be an ISO 8601 timestamp')
+        return None
+    if parsed.tzinfo is not None:
+        parsed = (parsed - parsed.utcoffset()).replace(tzinfo=None)
+    if parsed > datetime.utcnow() + timedelta(minutes=5):
+        errors.append('client_timestamp is in the future')
+    return parsed
+
+def validate_sync_entry(entry):
+    """Return (entry type, insert row, errors) for one uploaded entry."""
+    errors = []
+    if not isinstance(entry, dict):
+        return None, None, ['entry must be an object']
+    entry_type = entry.get('type')
+    key = entry.get('idempotency_key')
+    if not isinstance(key, str) or not 0 < len(key) <= 64:
+        errors.append('idempotency_key must be a string of 1-64 characters')
+    when = _parse_client_timestamp(entry.get('client_timestamp'), errors)
+    notes = entry.get('notes') or ''
+    if not isinstance(notes, str):
+        errors.append('notes must be a string')
+
+    if entry_type == 'exercise':
+        exercise_type = entry.get('exercise_type')
+        if not isinstance(exercise_type, str) or not 0 < len(exercise_type) <= 100:
+            errors.append('exercise_type must be a string of 1-100 characters')
+        row = {'exercise_type': exercise_type,
+               'duration': _int_field(entry, 'duration', 1, 24 * 60, errors),
+               'date_completed': when, 'notes': notes}
+    elif entry_type == 'wellness':
+        sleep_hours = entry.get('sleep_hours')
+        if sleep_hours not in (None, ''):
+            try:
+                sleep_hours = float(sleep_hours)
+                if not 0 <= sleep_hours <= 24:
+                    errors.append('sleep_hours must be between 0 and 24')
+            except (TypeError, ValueError):
+                errors.append('sleep_hours must be a number')
+        else:
+            sleep_hours = None
+        row = {'mood_rating': _int_field(entry, 'mood_rating', 1, 10, errors),
+               'stress_level': _int_field(entry, 'stress_level', 1, 10, errors),
+               'sleep_hours': sleep_hours, 'date_recorded': when, 'notes': notes}
+    elif entry_type == 'progress':
+        # Progress may point at a server exercise id or at an exercise in the same upload
+        exercise_id = entry.get('exercise_id')
+        exercise_key = entry.get('exercise_key')
+        if exercise_id is None and exercise_key is None:
+            errors.append('exercise_id or exercise_key is required')
+        if exercise_id is not None and (not isinstance(exercise_id, int) or isinstance(exercise_id, bool)
+                                        or not 1 <= exercise_id < 2 ** 63):
+            errors.append('exercise_id must be a positive integer')
+            exercise_id = None
+        if exercise_key is not None and (not isinstance(exercise_key, str) or not 0 < len(exercise_key) <= 64):
+            errors.append('exercise_key must be a string of 1-64 characters')
+            exercise_key = None
+        row = {'exercise_id': exercise_id,
+               'exercise_key': exercise_key,
+               'performance_rating': _int_field(entry, 'performance_rating', 1, 5, errors),
+               'energy_level': _int_field(entry, 'energy_level', 1, 10, errors),
+               'difficulty_felt': _int_field(entry, 'difficulty_felt', 1, 10, errors),
+               'date_recorded': when, 'notes': notes}
+    else:
+        return entry_type, None, ['type must be one of exercise, wellness, progress']
+    return entry_type, row, errors
+
+def _read_sync_payload():
+    """Decode a JSON array (or {"entries": [...]}) or an NDJSON body."""
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        lines = request.get_data(as_text=True).splitlines()
+        return [json.loads(line) for line in lines if line.strip()]
+    payload = request.get_json(silent=True)
+    if payload is None:
+        raise ValueError('expected a JSON (application/json) or NDJSON (application/x-ndjson) body')
+    if isinstance(payload, dict):
+        payload = payload.get('entries')
+    if not isinstance(payload, list):
+        raise ValueError('expected a JSON array of entries')
+    return payload
+
+@bp.route('/sync', methods=['POST'])
+def sync_entries():
+    """Ingest a batch of offline exercise, wellness and progress entries.
+
+    All valid entries are inserted with multi-row INSERTs in a single
+    transaction; the response carries one result per uploaded entry, in order.
+    Entries whose idempotency_key was already synced are reported as
+    duplicates with the id of the original row.
+
+    The upload commits in the request's own transaction rather than through
+    commit_write(). It is already a batch of rows in one commit, which is
+    what group commit buys the single-entry routes. A concurrent upload of
+    the same keys must fail this request alone with a 409; in a group it
+    would cost the other writes a retry. The SQLite busy timeout queues its
+    commit behind the writer thread's.
+    """
+    identity = current_identity()
+    if not identity:
+        return {'success': False, 'error': 'Please log in'}, 401
+    try:
+        entries = _read_sync_payload()
+    except ValueError as exc:  # includes json.JSONDecodeError
+        return {'success': False, 'error': f'Malformed payload: {exc}'}, 400
+    if len(entries) > current_app.config['SYNC_MAX_ENTRIES']:
+        return {'success': False, 'error': f'At most {current_app.config["SYNC_MAX_ENTRIES"]} entries per request'}, 413
+
+    results = [{'index': index, 'idempotency_key': entry.get('idempotency_key') if isinstance(entry, dict) else None}
+               for index, entry in enumerate(entries)]
+    keys = {result['idempotency_key'] for result in results if isinstance(result['idempotency_key'], str)}
+    synced = {receipt.idempotency_key: receipt for receipt in
+              SyncReceipt.query.filter(SyncReceipt.user_id == identity.id,
+                                       SyncReceipt.idempotency_key.in_(keys))} if keys else {}
+
+    pending = {'exercise': [], 'wellness': [], 'progress': []}
+    seen = set()
+    for result, entry in zip(results, entries):
+        entry_type, row, errors = validate_sync_entry(entry)
+        key = result['idempotency_key']
+        if errors:
+            result.update(status='invalid', errors=errors)
+        elif key in synced:
+            result.update(status='duplicate', type=synced[key].entry_type, id=synced[key].entry_id)
+        elif key in seen:
+            result.update(status='duplicate', type=entry_type)
+        else:
+            seen.add(key)
+            result['type'] = entry_type
+            pending[entry_type].append((result, dict(row, user_id=identity.id)))
+
+    # Resolve progress -> exercise references before writing anything
+    exercise_ids = {row['exercise_id'] for _, row in pending['progress'] if row['exercise_id']}
+    owned = {exercise_id for (exercise_id,) in db.session.query(Exercise.id).filter(
+        Exercise.user_id == identity.id, Exercise.id.in_(exercise_ids))} if exercise_ids else set()
+    batch_keys = {result['idempotency_key'] for result, _ in pending['exercise']}
+    for item in list(pending['progress']):
+        result, row = item
+        key = row['exercise_key']
+        if row['exercise_id']:
+            if row['exercise_id'] in owned:
+                continue
+            result.update(status='invalid', errors=['exercise_id does not exist'])
+        elif key in synced and synced[key].entry_type == 'exercise':
+            row['exercise_id'] = synced[key].entry_id
+            continue
+        elif key in batch_keys:
+            continue
+        else:
+            result.update(status='invalid', errors=['exercise_key does not match an exercise'])
+        pending['progress'].remove(item)
+
+    models = {'exercise': Exercise, 'wellness': WellnessEntry, 'progress': ProgressEntry}
+    receipts = []
+    new_ids = {}
+    for entry_type in ('exercise', 'wellness', 'progress'):  # exercises first: progress rows may need their ids
+        items = pending[entry_type]
+        if not items:
+            continue
+        rows = []
+        for result, row in items:
+            if entry_type == 'progress' and not row['exercise_id']:
+                row['exercise_id'] = new_ids[row['exercise_key']]
+            row.pop('exercise_key', None)
+            rows.append(row)
+        model = models[entry_type]
+        # One multi-row INSERT ... RETURNING per batch. SQLite hands out rowids
+        # in VALUES order, so sorted ids line up with rows (SQLAlchemy can't
+        # batch sort_by_parameter_order on SQLite and would go row by row)
+        ids = sorted(db.session.scalars(db.insert(model).returning(model.id), rows).all())
+        for (result, _), entry_id in zip(items, ids):
+            result.update(status='created', id=entry_id)
+            new_ids[result['idempotency_key']] = entry_id
+            receipts.append({'user_id': identity.id, 'idempotency_key': result['idempotency_key'],
+                             'entry_type': entry_type, 'entry_id': entry_id})
+
+    if receipts:
+        db.session.execute(db.insert(SyncReceipt), receipts)
+        exercise_rows = [row for _, row in pending['exercise']]
+        record_activity(identity.id,
+                        *(row.get('date_completed') or row.get('date_recorded')
+                          for items in pending.values() for _, row in items),
+                        exercises=len(exercise_rows),
+                        minutes=sum(row['duration'] for row in exercise_rows),
+                        wellness=len(pending['wellness']),
+                        progress=len(pending['progress']))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent upload of the same keys won the race; the client should retry
+        db.session.rollback()
+        return {'success': False, 'error': 'Conflicting concurrent sync, please retry'}, 409
+
+    created = sum(result.get('status') == 'created' for result in results)
+    return {'success': True, 'created': created, 'results': results}
+
+# Columns of the combined export; each history table fills the ones it has
+EXPORT_COLUMNS = ('type', 'id', 'user_id', 'recorded_at', 'exercise_type', 'duration', 'exercise_id',
+                  'mood_rating', 'stress_level', 'sleep_hours', 'performance_rating', 'energy_level',
+                  'difficulty_felt', 'notes')
+
+def export_sources():
+    """Return (type, model, selected columns) for every exported history table."""
+    return [
+        ('exercise', Exercise, [Exercise.date_completed.label('recorded_at'), Exercise.exercise_type,
+                                Exercise.duration, Exercise.notes]),
+        ('wellness', WellnessEntry, [WellnessEntry.date_recorded.label('recorded_at'), WellnessEntry.mood_rating,
+                                     WellnessEntry.stress_level, WellnessEntry.sleep_hours, WellnessEntry.notes]),
+        ('progress', ProgressEntry, [ProgressEntry.date_recorded.label('recorded_at'), ProgressEntry.exercise_id,
+                                     ProgressEntry.performance_rating, ProgressEntry.energy_level,
+                                     ProgressEntry.difficulty_felt, ProgressEntry.notes]),
+    ]
+
+def encode_cursor(value):
+    """Pack a JSON-serializable position into an opaque URL-safe cursor."""
+    return base64.urlsafe_b64encode(json.dumps(value, sort_keys=True).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Reverse encode_cursor(); raises ValueError for a malformed cursor."""
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (TypeError, ValueError, UnicodeDecodeError) as exc:
+        raise ValueError('invalid cursor') from exc
+
+def decode_export_cursor(cursor):
+    """Return {type: last exported id}; raises ValueError for a bad cursor."""
+    if not cursor:
+        return {}
+    last_ids = decode_cursor(cursor)
+    if not isinstance(last_ids, dict) or not all(isinstance(v, int) for v in last_ids.values()):
+        raise ValueError('invalid since cursor')
+    return last_ids
+
+def iter_export_rows(user_id, since, until, include_archive=True):
+    """Yield export rows as dicts, table by table in id order.
+
+    Rows are streamed from a server-side cursor in EXPORT_BATCH_SIZE batches,
+    so memory stays flat however long the history is. Archived rows of each
+    table come first, one user-month chunk at a time.
+    """
+    archive = current_app.extensions['history_archive']
+    for entry_type, model, columns in export_sources():
+        if include_archive:
+            fields = [column.key for column in columns if column.key != 'recorded_at']
+            for row in archive.iter_rows(entry_type, user_id=user_id, min_id=since.get(entry_type, 0) + 1,
+                                         max_id=until[entry_type]):
+                yield {'type': entry_type, 'id': row['id'], 'user_id': row['user_id'], 'recorded_at': row['at'],
+                       **{field: row[field] for field in fields}}
+        query = db.select(model.id, model.user_id, *columns).where(
+            model.id > since.get(entry_type, 0), model.id <= until[entry_type]).order_by(model.id)
+        if user_id is not None:
+            query = query.where(model.user_id == user_id)
+        result = db.session.execute(query.execution_options(yield_per=current_app.config['EXPORT_BATCH_SIZE']))
+        for row in result.mappings():
+            yield {'type': entry_type, **row}
+
+def _export_lines(rows, export_format):
+    """Serialize rows to CSV or NDJSON text chunks of roughly 64 KB."""
+    buffer = io.StringIO()
+    writer = None
+    if export_format == 'csv':
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS, extrasaction='ignore')
+        writer.writeheader()
+    for row in rows:
+        if row['recorded_at'] is not None:
+            row['recorded_at'] = row['recorded_at'].isoformat()
+        if writer:
+            writer.writerow(row)
+        else:
+            buffer.write(json.dumps(row) + '\n')
+        if buffer.tell() >= 65536:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+def export_response(user_id):
+    """Stream history as CSV or NDJSON, optionally gzip-compressed.
+
+    The X-Export-Cursor header holds the cursor to pass as ?since= on the next
+    pull to receive only rows added after this export started. Archived rows
+    are included unless ?archive=0.
+    """
+    export_format = request.args.get('format', 'csv')
+    if export_format not in ('csv', 'ndjson'):
+        return {'success': False, 'error': 'format must be csv or ndjson'}, 400
+    try:
+        since = decode_export_cursor(request.args.get('since'))
+    except ValueError as exc:
+        return {'success': False, 'error': str(exc)}, 400
+
+    # Freeze the upper bound so the export and its cursor describe the same snapshot
+    until = {}
+    for entry_type, model, _ in export_sources():
+        until[entry_type] = max(db.session.query(db.func.max(model.id)).scalar() or 0, since.get(entry_type, 0))
+
+    include_archive = request.args.get('archive', '1') not in ('0', 'false')
+    chunks = _export_lines(iter_export_rows(user_id, since, until, include_archive), export_format)
+    headers = {'X-Export-Cursor': encode_cursor(until)}
+    if request.accept_encodings['gzip']:
+        chunks = _gzip_chunks(chunks)
+        headers['Content-Encoding'] = 'gzip'
+        headers['Vary'] = 'Accept-Encoding'
+    extension, mimetype = ('csv', 'text/csv') if export_format == 'csv' else ('ndjson', 'application/x-ndjson')
+    name = 'all-users' if user_id is None else f'user-{user_id}'
+    headers['Content-Disposition'] = f'attachment; filename=nest-nourish-{name}.{extension}'
+    return Response(stream_with_context(chunks), mimetype=mimetype, headers=headers)
+
+@bp.route('/export')
+def export_history():
+    identity = current_identity()
+    if not identity:
+        flash('Please log in to export your data.', 'warning')
+        return redirect(url_for('main.login'))
+    return export_response(identity.id)
+
+@bp.route('/export/all')
+def export_all_history():
+    # Checked against the User row, not the identity snapshot, so revoking
+    # admin rights takes effect at once
+    if not current_user.is_authenticated or not current_user.is_admin:
+        return redirect(url_for('main.login', next=request.url))
+    return export_response(None)
+
+def history_sources():
+    """Map history API kinds to (model, date column, serialized columns)."""
+    return {
+        'exercises': (Exercise, Exercise.date_completed, ('exercise_type', 'duration', 'notes')),
+        'wellness': (WellnessEntry, WellnessEntry.date_recorded,
+                     ('mood_rating', 'stress_level', 'sleep_hours', 'notes')),
+        'progress': (ProgressEntry, ProgressEntry.date_recorded,
+                     ('exercise_id', 'performance_rating', 'energy_level', 'difficulty_felt', 'notes')),
+    }
+
+def history_cursor(date, entry_id):
+    """Cursor pointing just past the given (date, id) in newest-first order."""
+    return encode_cursor([date.isoformat(), entry_id])
+
+def _parse_history_bound(value, end=False):
+    """Parse a start/end query argument; a bare end date includes that whole day."""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if end and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+def history_page(user_id, kind, limit, cursor=None, exercise_type=None, start=None, end=None,
+                 include_archive=False):
+    """Return (rows, next cursor) for one newest-first page of a user's history.
+
+    Pages seek past the cursor's (date, id) on the (user_id, date DESC, id DESC)
+    index instead of using OFFSET, so every page costs the same to fetch.
+    With include_archive, archived rows (see archived_history()) are merged
+    in, so paging carries on past the archive cutoff.
+    """
+    model, date_column, _ = history_sources()[kind]
+    query = model.query.filter(model.user_id == user_id, date_column.isnot(None))
+    if exercise_type:
+        query = query.filter(Exercise.exercise_type == exercise_type)
+    if start:
+        query = query.filter(date_column >= start)
+    if end:
+        query = query.filter(date_column < end)
+    if cursor:
+        date, entry_id = cursor
+        query = query.filter(db.tuple_(date_column, model.id) < db.tuple_(date, entry_id))
+    rows = query.order_by(date_column.desc(), model.id.desc()).limit(limit + 1).all()
+    if include_archive:
+        hot_ids = {row.id for row in rows}
+        archived = (row for row in archived_history(user_id, kind, cursor, exercise_type, start, end)
+                    if row.id not in hot_ids)
+        rows = sorted(rows + list(itertools.islice(archived, limit + 1)),
+                      key=lambda row: (getattr(row, date_column.key), row.id), reverse=True)[:limit + 1]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = history_cursor(getattr(rows[-1], date_column.key), rows[-1].id)
+    return rows, next_cursor
+
+def archived_history(user_id, kind, cursor=None, exercise_type=None, start=None, end=None):
+    """Archived rows of a user's history, newest first, shaped like history_page() rows."""
+    model, date_column, _ = history_sources()[kind]
+    entry_type = {'exercises': 'exercise', 'wellness': 'wellness', 'progress': 'progress'}[kind]
+    for row in current_app.extensions['history_archive'].iter_rows(
+            entry_type, user_id=user_id, start=start, end=end, before=cursor, newest_first=True):
+        if exercise_type and row['exercise_type'] != exercise_type:
+            continue
+        row[date_column.key] = row.pop('at')
+        yield SimpleNamespace(**row)
+
+@bp.route('/api/history/<kind>')
+def history_api(kind):
+    """Keyset-paginated JSON history for the logged-in user.
+
+    Query arguments: limit, cursor (from the previous page's next_cursor),
+    exercise_type (exercises only), start and end (ISO dates or datetimes),
+    archive=1 to page on into archived history.
+    """
+    identity = current_identity()
+    if not identity:
+        return {'success': False, 'error': 'Please log in'}, 401
+    sources = history_sources()
+    if kind not in sources:
+        return {'success': False, 'error': f'Unknown history kind {kind!r}'}, 404
+
+    exercise_type = request.args.get('exercise_type')
+    if exercise_type and kind != 'exercises':
+        return {'success': False, 'error': 'exercise_type only applies to exercises'}, 400
+    try:
+        limit = int(request.args.get('limit', current_app.config['HISTORY_PAGE_SIZE']))
+        limit = max(1, min(limit, current_app.config['HISTORY_MAX_PAGE_SIZE']))
+        start = _parse_history_bound(request.args.get('start'))
+        end = _parse_history_bound(request.args.get('end'), end=True)
+        cursor = request.args.get('cursor')
+        if cursor:
+            date, entry_id = decode_cursor(cursor)
+            cursor = (datetime.fromisoformat(date), int(entry_id))
+    except (TypeError, ValueError):
+        return {'success': False, 'error': 'Invalid limit, cursor or date range'}, 400
+
+    include_archive = request.args.get('archive') in ('1', 'true')
+    rows, next_cursor = history_page(identity.id, kind, limit, cursor, exercise_type=exercise_type,
+                                     start=start, end=end, include_archive=include_archive)
+    _, date_column, fields = sources[kind]
+    items = []
+    for row in rows:
+        item = {'id': row.id, 'date': getattr(row, date_column.key).isoformat()}
+        item.update((field, getattr(row, field)) for field in fields)
+        items.append(item)
+    return {'success': True, 'items': items, 'next_cursor': next_cursor}
+
+def archive_sources():
+    """(archive kind, model, date column, kept columns), in the order they're archived.
+
+    Progress entries go first: an exercise stays in the main database for
+    as long as a progress entry there refers to it.
+    """
+    return [
+        ('progress', ProgressEntry, ProgressEntry.date_recorded,
+         [ProgressEntry.exercise_id, Exercise.exercise_type, ProgressEntry.performance_rating,
+          ProgressEntry.energy_level, ProgressEntry.difficulty_felt, ProgressEntry.notes]),
+        ('wellness', WellnessEntry, WellnessEntry.date_recorded,
+         [WellnessEntry.mood_rating, WellnessEntry.stress_level, WellnessEntry.sleep_hours, WellnessEntry.notes]),
+        ('exercise', Exercise, Exercise.date_completed, [Exercise.exercise_type, Exercise.duration, Exercise.notes]),
+    ]
 
-@app.route('/profile', methods=['GET', 'POST'])
+def archive_history(older_than_days=None):
+    """Move log rows older than ARCHIVE_AFTER_DAYS to the archive; returns rows moved per kind.
+
+    Rows are walked in (date, id) order on the admin list indexes and moved
+    ARCHIVE_BATCH_SIZE at a time: stored in the archive, then deleted here,
+    each batch in a short transaction of its own. Rows inside the wellness
+    trend window are never archived, and neither is each table's newest
+    row, so SQLite never hands out an archived id again. The UserStats
+    rollup already counts the moved rows and is left as it is.
+    """
+    config = current_app.config
+    days = max(older_than_days or config['ARCHIVE_AFTER_DAYS'], config['TREND_HISTORY_DAYS'])
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    archive = current_app.extensions['history_archive']
+    moved = {}
+    for kind, model, date_column, columns in archive_sources():
+        newest = db.session.query(db.func.max(model.id)).scalar() or 0
+        query = (db.select(model.id, model.user_id, date_column.label('at'), *columns)
+                 .where(date_column < cutoff, model.id < newest)
+                 .order_by(date_column, model.id).limit(config['ARCHIVE_BATCH_SIZE']))
+        if model is ProgressEntry:
+            query = query.outerjoin(Exercise, Exercise.id == ProgressEntry.exercise_id)
+        if model is Exercise:
+            query = query.where(~db.exists().where(ProgressEntry.exercise_id == Exercise.id))
+        moved[kind] = 0
+        position = None
+        while True:
+            batch = query if position is None else query.where(db.tuple_(date_column, model.id) > db.tuple_(*position))
+            rows = db.session.execute(batch).mappings().all()
+            if not rows:
+                break
+            archive.store(kind, rows)
+            db.session.execute(db.delete(model).where(model.id.in_([row['id'] for row in rows])))
+            db.session.commit()
+            moved[kind] += len(rows)
+            position = (rows[-1]['at'], rows[-1]['id'])
+    archive.checkpoint()
+    return moved
+
+def history_table_sizes():
+    """{table: (rows, table bytes, index bytes)} for the hot log tables, from dbstat."""
+    sizes = {}
+    for model in (Exercise, WellnessEntry, ProgressEntry):
+        table = model.__tablename__
+        pages = db.session.execute(db.text(
+            'SELECT s.name = :table, sum(s.pgsize) FROM dbstat AS s JOIN sqlite_schema AS m ON m.name = s.name '
+            'WHERE m.tbl_name = :table GROUP BY s.name = :table'), {'table': table}).all()
+        by_kind = dict(pages)
+        sizes[table] = (db.session.query(db.func.count(model.id)).scalar(), by_kind.get(1, 0), by_kind.get(0, 0))
+    return sizes
+
+@bp.cli.command('archive-history')
+@click.option('--older-than', 'days', type=int, help='Age in days; default ARCHIVE_AFTER_DAYS.')
+@click.option('--sizes', is_flag=True, help='Report the hot tables\' rows and sizes afterwards.')
+def archive_history_command(days, sizes):
+    """Move old exercise, wellness and progress rows to the archive; meant to run on a schedule."""
+    started = time.perf_counter()
+    moved = archive_history(days)
+    click.echo(f'Archived {moved["exercise"]} exercise, {moved["wellness"]} wellness and '
+               f'{moved["progress"]} progress row(s) in {time.perf_counter() - started:.2f}s.')
+    if sizes:
+        for table, (rows, table_bytes, index_bytes) in history_table_sizes().items():
+            click.echo(f'{table}: {rows} row(s), {table_bytes / 2**20:.1f} MB table, '
+                       f'{index_bytes / 2**20:.1f} MB indexes')
+        archive = current_app.extensions['history_archive'].stats()
+        click.echo(f'archive: {sum(kind["rows"] for kind in archive["kinds"].values())} row(s), '
+                   f'{archive["file_bytes"] / 2**20:.1f} MB')
+
+# Whole days since 1970-01-01, computed by SQLite so rows arrive as plain numbers
+WELLNESS_DAY = db.cast(db.func.julianday(WellnessEntry.date_recorded) - 2440587.5, db.Integer)
+
+def cached_trends(key, version, compute):
+    """Serve a trend result from the trend cache while ``version`` is unchanged.
+
+    The version is a count of wellness entries taken from UserStats, so
+    entries logged through any worker (or /sync) make other workers
+    recompute on their next request.
+    """
+    cache = current_app.extensions['trend_cache']
+    def load():
+        return version, compute()
+
+    cached_version, result = cache.get_or_load(key, load)
+    if cached_version != version:
+        cache.discard(key)
+        cached_version, result = cache.get_or_load(key, load)
+    return result
+
+def wellness_columns(query):
+    """Run a query of numeric columns and load them into NumPy arrays.
+
+    Rows are read straight off the DBAPI cursor as plain tuples, which NumPy
+    converts in C; going through SQLAlchemy Row objects costs several times
+    more on large pulls.
+    """
+    import wellness_trends  # NumPy is only loaded once trends are first asked for
+    result = db.session.connection().execute(query)
+    try:
+        rows = result.cursor.fetchall()
+    finally:
+        result.close()
+    return wellness_trends.entry_arrays(rows, len(query.selected_columns))
+
+def wellness_trend_query(since, user_id=None):
+    query = db.select(WELLNESS_DAY, WellnessEntry.mood_rating, WellnessEntry.stress_level,
+                      WellnessEntry.sleep_hours).where(WellnessEntry.date_recorded >= since)
+    if user_id is not None:
+        query = query.where(WellnessEntry.user_id == user_id)
+    return query
+
+def user_wellness_trends(user_id):
+    """Daily/weekly/monthly and rolling mood, stress and sleep trends for one user."""
+    import wellness_trends
+    config = current_app.config
+    version = db.session.query(UserStats.wellness_count).filter_by(user_id=user_id).scalar() or 0
+
+    def compute():
+        since = datetime.utcnow() - timedelta(days=config['TREND_HISTORY_DAYS'])
+        columns = wellness_columns(wellness_trend_query(since, user_id))
+        return wellness_trends.trends(*columns, window=config['TREND_ROLLING_DAYS'])
+
+    return cached_trends(('user', user_id), version, compute)
+
+def wellness_cohort_stats():
+    """Wellness averages per postpartum_months cohort, plus trends across all users."""
+    import wellness_trends
+    config = current_app.config
+    version = db.session.query(db.func.sum(UserStats.wellness_count)).scalar() or 0
+
+    def compute():
+        since = datetime.utcnow() - timedelta(days=config['TREND_HISTORY_DAYS'])
+        cohorts = wellness_trends.cohorts(*wellness_columns(
+            db.select(db.func.coalesce(User.postpartum_months, 0), WellnessEntry.user_id, WellnessEntry.mood_rating,
+                      WellnessEntry.stress_level, WellnessEntry.sleep_hours)
+            .join(User, User.id == WellnessEntry.user_id)
+            .where(WellnessEntry.date_recorded >= since)))
+        for cohort in cohorts:
+            cohort['postpartum_months'] = cohort.pop('group')
+        columns = wellness_columns(wellness_trend_query(since))
+        return {
+            'history_days': config['TREND_HISTORY_DAYS'],
+            'cohorts': cohorts,
+            'all_users': wellness_trends.trends(*columns, window=config['TREND_ROLLING_DAYS']),
+        }
+
+    return cached_trends(('cohorts',), version, compute)
+
+@bp.route('/api/wellness/trends')
+def wellness_trends_api():
+    """Wellness trends for the logged-in user, for the mental wellness charts."""
+    identity = current_identity()
+    if not identity:
+        return {'success': False, 'error': 'Please log in'}, 401
+    return {'success': True, 'history_days': current_app.config['TREND_HISTORY_DAYS'],
+            'trends': user_wellness_trends(identity.id)}
+
+def search_result_url(result):
+    """Page that shows a search result's content."""
+    if result['kind'] == 'exercise_video':
+        return url_for('main.get_exercise_videos', exercise_type=result['category'])
+    if result['kind'] == 'recovery_tip':
+        return url_for('main.recovery')
+    if result['kind'] == 'tip':
+        return url_for('main.dashboard')
+    return url_for('main.mental_wellness')
+
+def search_content():
+    """Run the search described by the request's q, kind, category, difficulty, page and limit.
+
+    Result pages are cached per worker until the content version changes,
+    which keeps repeated broad queries (search-as-you-type prefixes) cheap.
+    """
+    config = current_app.config
+    limit = max(1, min(request.args.get('limit', config['SEARCH_PAGE_SIZE'], type=int),
+                       config['SEARCH_MAX_PAGE_SIZE']))
+    page = max(1, request.args.get('page', 1, type=int))
+    query = request.args.get('q', '')[:200]
+    filters = {facet: request.args.get(facet) for facet in search_index.FACETS if request.args.get(facet)}
+
+    search_cache = current_app.extensions['search_cache']
+    search_cache.sync_version(content_version()[0])
+    key = (search_index.match_expression(query), tuple(sorted(filters.items())), limit, page)
+    found = search_cache.get_or_load(key, lambda: search_index.search(
+        db.session.connection(), query, filters, limit=limit, offset=(page - 1) * limit))
+    return dict(found, query=query, filters=filters, page=page, limit=limit,
+                has_more=page * limit < found['total'],
+                results=[dict(item, url=search_result_url(item)) for item in found['results']])
+
+@bp.route('/api/search')
+def search_api():
+    """Ranked content search with facet counts.
+
+    Query arguments: q (words are matched as prefixes), kind, category,
+    difficulty, page and limit.
+    """
+    if not current_identity():
+        return {'success': False, 'error': 'Please log in'}, 401
+    return dict(search_content(), success=True)
+
+@bp.route('/search')
+def search():
+    if not current_identity():
+        flash('Please log in to access this page.', 'warning')
+        return redirect(url_for('main.login'))
+    result = search_content()
+
+    def search_url(**changes):
+        args = dict(result['filters'], q=result['query'])
+        args.update(changes)
+        return url_for('main.search', **{name: value for name, value in args.items() if value})
+
+    def facet_url(facet, value):
+        # Choosing the selected value again clears the facet
+        return search_url(page=None, **{facet: None if result['filters'].get(facet) == value else value})
+
+    return render_template('search.html', search=result, search_url=search_url, facet_url=facet_url)
+
+@bp.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Create the content search index if needed and re-index all content."""
+    indexed = search_index.rebuild_index(db.session.connection())
+    db.session.commit()
+    click.echo(f'Indexed {indexed} content row(s).')
+
+@bp.route('/profile', methods=['GET', 'POST'])
 def profile():
-    if 'user_id' not in session:
+    if not current_identity():
         flash('Please log in to access your profile.', 'warning')
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     
-    user = User.query.get(session['user_id'])
-    if not user:
+    user = current_user._get_current_object()
+    if not user.is_authenticated:
         flash('User not found. Please log in again.', 'danger')
         session.clear()
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
         
     if request.method == 'POST':
         user.postpartum_months = int(request.form.get('postpartum_months', user.postpartum_months))
         user.full_name = request.form.get('full_name', user.full_name)
         db.session.commit()
+        remember_identity(user)
         flash('Profile updated successfully!', 'success')
-        return redirect(url_for('profile'))
-        
-    return render_template('profile.html', user=user)
+        return redirect(url_for('main.profile'))
+
+    stats = db.session.get(UserStats, user.id) or UserStats(
+        exercise_count=0, total_minutes=0, wellness_count=0, progress_count=0,
+        current_streak=0, longest_streak=0)
+    return render_template('profile.html', user=user, stats=stats)
+
+def plan_check_paths(exercise_type='Walking', username='admin'):
+    """Pages whose SQL must stay index-backed, with a deep keyset page of each list."""
+    history = history_cursor(datetime(2100, 1, 1), 2 ** 62)
+    admin = encode_cursor(['2100-01-01T00:00:00', 2 ** 62])
+    # Admin filters are flt<position>_<index in the view's column_filters>
+    return [
+        '/dashboard',
+        '/profile',
+        '/exercise',
+        f'/get_exercise_videos/{exercise_type}',
+        '/recovery',
+        '/mental_wellness',
+        '/search?q=yoga',
+        f'/api/history/exercises?cursor={history}',
+        f'/api/history/exercises?exercise_type={exercise_type}&cursor={history}',
+        f'/api/history/wellness?cursor={history}',
+        f'/api/history/progress?cursor={history}',
+        '/export?format=ndjson',
+        '/admin/user/',
+        f'/admin/user/?after={admin}',
+        f'/admin/user/?flt0_0={username}',
+        f'/admin/user/?flt0_1={username}@example.com',
+        '/admin/exercise/',
+        f'/admin/exercise/?after={admin}',
+        f'/admin/exercise/?flt0_0={username}',
+        f'/admin/exercise/?flt0_1={exercise_type}',
+        '/admin/wellnessentry/',
+        f'/admin/wellnessentry/?after={admin}',
+        '/admin/progressentry/',
+        f'/admin/progressentry/?after={admin}',
+        f'/admin/progressentry/?flt0_1={exercise_type}',
+        '/admin/progressentry/?flt0_2=2024-01-01+00:00:00+to+2024-02-01+00:00:00',
+        '/admin/userstats/',
+        f'/admin/userstats/?after={admin}',
+        f'/admin/userstats/?flt0_0={username}',
+    ]
+
+def test_client_as(username):
+    """A test client whose session is logged in as username, for the check commands."""
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        raise click.UsageError(f'No user named {username!r}.')
+    client = current_app.test_client()
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user.id)
+    return user, client
+
+# A primary key or UNIQUE constraint lookup: at most one row
+UNIQUE_LOOKUP = re.compile(r'SEARCH \S+ USING (INTEGER PRIMARY KEY \(rowid=\?\)|(COVERING )?INDEX sqlite_autoindex_\S+ \(\w+=\?\))')
+
+def plan_problems(plan):
+    """Steps of an EXPLAIN QUERY PLAN that scan a table or sort through a temp B-tree.
+
+    Scanning a subquery's result or an FTS5 index is fine. So is a temp
+    B-tree over rows that unique-key lookups found (one row at most) or over
+    FTS5 matches, which have no index order to use.
+    """
+    subqueries = {step.split()[1] for step in plan if step.startswith(('CO-ROUTINE ', 'MATERIALIZE '))}
+    sources = [step for step in plan if step.startswith(('SEARCH ', 'SCAN ')) and step.split()[1] not in subqueries]
+    sorting_ok = (all(UNIQUE_LOOKUP.match(step) for step in sources)
+                  or any('VIRTUAL TABLE INDEX' in step for step in sources))
+    return [step for step in plan if ('TEMP B-TREE' in step and not sorting_ok) or (
+        step in sources and step.startswith('SCAN ') and 'VIRTUAL TABLE INDEX' not in step
+        and step != 'SCAN CONSTANT ROW')]
+
+@bp.cli.command('check-query-plans')
+@click.option('--username', default='admin', help='Existing admin user to browse as.')
+@click.option('--exercise-type', default='Walking', help='Exercise type to filter by.')
+def check_query_plans(username, exercise_type):
+    """Fail if a page's SQL falls back to a table scan or temp sort.
+
+    Each page in plan_check_paths() is requested through the test client
+    and every SELECT it runs is recorded and EXPLAINed, so the check covers
+    the statements the routes actually send.
+    """
+    user, client = test_client_as(username)
+    if not user.is_admin:
+        raise click.UsageError(f'{username!r} is not an admin; the admin lists need one.')
+    app = current_app._get_current_object()
+
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            statements.append((statement, parameters))
+
+    seen = set()
+    failures = 0
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        for path in plan_check_paths(exercise_type, username):
+            statements.clear()
+            with app.app_context():
+                response = client.get(path)
+                response.get_data()  # runs streamed responses to the end
+            problems = [] if response.status_code == 200 else [f'status {response.status_code}']
+            checked = 0
+            for statement, parameters in statements:
+                if statement in seen:  # e.g. the same query served again on a later page
+                    continue
+                seen.add(statement)
+                checked += 1
+                plan = [row[-1] for row in db.session.connection().exec_driver_sql(
+                    f'EXPLAIN QUERY PLAN {statement}', parameters)]
+                bad = plan_problems(plan)
+                if bad:
+                    problems.append(f'{"; ".join(bad)} in: {" ".join(statement.split())[:200]}')
+            click.echo(f'{"FAIL" if problems else "ok":4} {path}: {checked} new statement(s)')
+            for problem in problems:
+                click.echo(f'     {problem}')
+            failures += bool(problems)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    if failures:
+        raise SystemExit(f'{failures} page(s) ran a query that scans a table or sorts without an index')
+
+# Most queries against the user table one logged-in page view may run
+USER_QUERY_BUDGETS = {
+    '/': 0,
+    '/dashboard': 1,
+    '/profile': 1,
+    '/exercise': 0,
+    '/get_exercise_videos/Walking': 0,
+    '/recovery': 0,
+    '/mental_wellness': 0,
+    '/search?q=yoga': 0,
+}
+
+@bp.cli.command('check-query-counts')
+@click.option('--username', default='admin', help='Existing user to browse as.')
+def check_query_counts(username):
+    """Fail if a page view loads the current user more often than budgeted."""
+    user, client = test_client_as(username)
+    app = current_app._get_current_object()
+
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        # Each request gets its own app context (and so its own g and session),
+        # as it would when served, instead of reusing the CLI's
+        with app.app_context():
+            client.get('/dashboard')  # first request takes the identity snapshot
+        failures = 0
+        for path, budget in USER_QUERY_BUDGETS.items():
+            statements.clear()
+            with app.app_context():
+                response = client.get(path)
+            user_queries = sum(1 for statement in statements if re.search(r'FROM "?user"?(\s|$)', statement))
+            status = 'FAIL' if user_queries > budget else 'ok'
+            click.echo(f'{status:4} {path} [{response.status_code}]: '
+                       f'{user_queries} user / {len(statements)} total queries (budget {budget})')
+            failures += user_queries > budget
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    if failures:
+        raise SystemExit(f'{failures} route(s) exceeded their user query budget')
+
+def insert_missing(model, key, rows):
+    """Insert the rows whose natural key isn't in the table yet, in one statement.
+
+    One query fetches the existing keys instead of one lookup per row.
+    """
+    column = getattr(model, key)
+    existing = set(db.session.scalars(db.select(column).where(column.in_([row[key] for row in rows]))))
+    missing = [row for row in rows if row[key] not in existing]
+    if missing:
+        db.session.execute(db.insert(model), missing)
+    return len(missing)
 
 def create_sample_data():
     """Create sample data for testing"""
@@ -397,11 +2313,6 @@ def create_sample_data():
         (12, "Your baby is becoming more active. Make time for activities that bring you joy."),
     ]
     
-    for month, tip in mental_tips_data:
-        if not MentalTip.query.filter_by(month_relation=month).first():
-            mental_tip = MentalTip(month_relation=month, tip_content=tip)
-            db.session.add(mental_tip)
-    
     # Recovery tips for different stages
     recovery_tips_data = [
         ("Early", "Gentle Recovery", "Focus on healing and rest. Listen to your body's needs."),
@@ -412,11 +2323,6 @@ def create_sample_data():
         ("Late", "Active Lifestyle", "Incorporate regular exercise that you enjoy."),
     ]
     
-    for stage, title, content in recovery_tips_data:
-        if not RecoveryTip.query.filter_by(title=title).first():
-            recovery_tip = RecoveryTip(title=title, content=content, recovery_stage=stage)
-            db.session.add(recovery_tip)
-    
     # Exercise videos
     exercise_videos_data = [
         ("Prenatal Yoga", "Gentle Prenatal Flow", "https://example.com/prenatal-yoga", "Gentle yoga for expecting mothers", "Beginner", 20),
@@ -426,18 +2332,6 @@ def create_sample_data():
         ("Pelvic Floor Exercises", "Pelvic Floor Basics", "https://example.com/pelvic-floor", "Essential pelvic floor exercises", "Beginner", 10),
     ]
     
-    for ex_type, title, url, desc, level, duration in exercise_videos_data:
-        if not ExerciseVideo.query.filter_by(title=title).first():
-            video = ExerciseVideo(
-                exercise_type=ex_type,
-                title=title,
-                video_url=url,
-                description=desc,
-                difficulty_level=level,
-                duration=duration
-            )
-            db.session.add(video)
-    
     # Mental wellness resources
     wellness_resources_data = [
         ("Breathing Exercise", "5-Minute Calm", "Take 5 minutes to focus on deep breathing...", "Exercise", "Anxiety"),
@@ -445,39 +2339,208 @@ def create_sample_data():
         ("Meditation Guide", "Mindful Moments", "Brief meditation practices for busy mothers...", "Meditation", "Stress"),
     ]
     
-    for title, subtitle, content, res_type, mood_cat in wellness_resources_data:
-        if not MentalWellnessResource.query.filter_by(title=title).first():
-            resource = MentalWellnessResource(
-                title=title,
-                content=content,
-                resource_type=res_type,
-                mood_category=mood_cat
-            )
-            db.session.add(resource)
+    created = insert_missing(MentalTip, 'month_relation', [
+        dict(month_relation=month, tip_content=tip) for month, tip in mental_tips_data])
+    created += insert_missing(RecoveryTip, 'title', [
+        dict(title=title, content=content, recovery_stage=stage) for stage, title, content in recovery_tips_data])
+    created += insert_missing(ExerciseVideo, 'title', [
+        dict(exercise_type=ex_type, title=title, video_url=url, description=desc,
+             difficulty_level=level, duration=duration)
+        for ex_type, title, url, desc, level, duration in exercise_videos_data])
+    created += insert_missing(MentalWellnessResource, 'title', [
+        dict(title=title, content=content, resource_type=res_type, mood_category=mood_cat)
+        for title, subtitle, content, res_type, mood_cat in wellness_resources_data])
     
+    if created:
+        bump_content_version()
     db.session.commit()
+    return created
 
-# Create database tables
-with app.app_context():
-    db.create_all()
-    
-    # Create a default admin user if it doesn't exist
+@bp.cli.command('seed')
+def seed_command():
+    """Create the default admin user and the sample content (run after db upgrade)."""
     admin_user = User.query.filter_by(username='admin').first()
     if not admin_user:
         admin_user = User(
             username='admin',
             email='admin@example.com',
-            password_hash=generate_password_hash('admin123'),
+            password_hash=generate_password_hash('admin123', current_app.config['PASSWORD_HASH_METHOD']),
             full_name='Administrator',
             is_admin=True
         )
         db.session.add(admin_user)
         db.session.commit()
-        print("Default admin user created: username='admin', password='admin123'")
+        click.echo("Default admin user created: username='admin', password='admin123'")
     
-    # Create sample data
-    create_sample_data()
-    print("Sample data created successfully!")
+    click.echo(f'Sample data created: {create_sample_data()} new row(s).')
+
+STARTUP_PROBE = """
+import time
+started = time.perf_counter()
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+connects = []
+event.listen(Engine, 'connect', lambda *args: connects.append(1))
+import app
+imported = time.perf_counter()
+app.create_app()
+created = time.perf_counter()
+print(imported - started, created - imported, len(connects))
+"""
+
+@bp.cli.command('bench-startup')
+@click.option('--runs', default=5, show_default=True, help='Fresh interpreters to time.')
+def bench_startup(runs):
+    """Time a cold import + create_app() and fail if startup touches the database."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', STARTUP_PROBE], cwd=here,
+                             capture_output=True, text=True, check=True).stdout.split()
+        samples.append((float(out[0]), float(out[1]), int(out[2])))
+    import_ms = statistics.median(sample[0] for sample in samples) * 1000
+    create_ms = statistics.median(sample[1] for sample in samples) * 1000
+    connects = max(sample[2] for sample in samples)
+    click.echo(f'import app: {import_ms:.1f} ms, create_app(): {create_ms:.1f} ms '
+               f'(median of {runs}), database connections: {connects}')
+    if connects:
+        raise SystemExit('startup opened a database connection')
+
+def init_admin(app):
+    """Build the Flask-Admin views for app.
+
+    Done per application so workers with ADMIN_ENABLED off skip the form
+    scaffolding entirely.
+    """
+    admin = Admin(app, name='NourishAdmin', template_mode='bootstrap3')
+    admin.add_view(UserAdminView(User, db.session))
+    admin.add_view(ExerciseAdminView(Exercise, db.session))
+    admin.add_view(WellnessEntryAdminView(WellnessEntry, db.session))
+    admin.add_view(ContentModelView(Tip, db.session))
+    admin.add_view(ContentModelView(MentalTip, db.session))
+    admin.add_view(ContentModelView(RecoveryTip, db.session))
+    admin.add_view(ContentModelView(MentalWellnessResource, db.session))
+    admin.add_view(ContentModelView(ExerciseVideo, db.session))
+    admin.add_view(ProgressEntryAdminView(ProgressEntry, db.session))
+    admin.add_view(UserStatsAdminView(UserStats, db.session))
+    admin.add_view(StatsView(app.extensions['content_cache'].stats, name='Content Cache', endpoint='content_cache'))
+    admin.add_view(StatsView(app.extensions['search_cache'].stats, name='Search Cache', endpoint='search_cache'))
+    admin.add_view(StatsView(app.extensions['password_hasher'].stats, name='Password Hashing', endpoint='password_hashing'))
+    admin.add_view(StatsView(app.extensions['db_writer'].stats, name='Write Batching', endpoint='write_batching'))
+    admin.add_view(StatsView(app.extensions['history_archive'].stats, name='Archive', endpoint='archive'))
+    admin.add_view(WellnessCohortView(wellness_cohort_stats, name='Wellness Cohorts', endpoint='wellness_cohorts'))
+    if 'request_profiler' in app.extensions:
+        admin.add_view(PerformanceView(app.extensions['request_profiler'].stats, name='Performance',
+                                       endpoint='performance'))
+    return admin
+
+def init_sqlite(app):
+    """Set the journal mode and busy timeout on each new SQLite connection."""
+    with app.app_context():
+        engine = db.engine  # no connection is made until the first query
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def configure_connection(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f'PRAGMA busy_timeout = {int(app.config["SQLITE_BUSY_TIMEOUT"])}')
+        if app.config['SQLITE_WAL']:
+            # Stored in the database file; the first connection converts it
+            cursor.execute('PRAGMA journal_mode = WAL')
+            cursor.execute(f'PRAGMA synchronous = {app.config["SQLITE_SYNCHRONOUS"]}')
+        cursor.close()
+
+def init_profiler(app):
+    """Time every request and the SQL it runs, per endpoint.
+
+    Statements are timed with engine events and attributed to the request
+    being served; anything run outside a request (CLI commands, or a
+    streamed response after its headers went out) isn't recorded. Only
+    admins get the Server-Timing header, as only they can see /admin/performance/.
+    """
+    profiler = app.extensions['request_profiler'] = RequestProfiler(
+        window=app.config['PROFILER_WINDOW'], slow_statements=app.config['PROFILER_SLOW_STATEMENTS'],
+        repeat_threshold=app.config['PROFILER_REPEAT_THRESHOLD'])
+    with app.app_context():
+        engine = db.engine  # no connection is made until the first query
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_statement(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('statement_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def finish_statement(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['statement_started'].pop()
+        profile = g.get('profile') if has_request_context() else None
+        if profile is not None:
+            profile.record(statement, time.perf_counter() - started)
+
+    @event.listens_for(engine, 'handle_error')
+    def failed_statement(context):
+        if context.connection is not None and context.connection.info.get('statement_started'):
+            context.connection.info['statement_started'].pop()
+
+    @app.before_request
+    def start_profile():
+        g.profile = profiler.begin()
+
+    @app.after_request
+    def finish_profile(response):
+        profile = g.pop('profile', None)
+        if profile is not None:
+            total, db_time, queries = profiler.finish(request.endpoint or 'unmatched', profile)
+            identity = current_identity()
+            if app.config['PROFILER_SERVER_TIMING'] and identity and identity.is_admin:
+                response.headers['Server-Timing'] = server_timing(total, db_time, queries)
+        return response
+
+    return profiler
+
+def create_app(config=None):
+    """Application factory.
+
+    Builds the app without touching the database: tables come from
+    ``flask db upgrade`` and the default data from ``flask seed``. Settings
+    can be overridden by ``config`` or ``FLASK_``-prefixed environment
+    variables (e.g. ``FLASK_PASSWORD_HASH_WORKERS=4``).
+    """
+    app = Flask(__name__)
+    app.config.from_mapping(DEFAULT_CONFIG)
+    app.config.from_prefixed_env()
+    if config:
+        app.config.from_mapping(config)
+
+    db.init_app(app)
+    migrate.init_app(app, db, include_name=search_index.include_name)
+    login_manager.init_app(app, add_context_processor=False)
+    app.extensions['content_cache'] = ContentCache(maxsize=app.config['CONTENT_CACHE_SIZE'],
+                                                   default_ttl=app.config['CONTENT_CACHE_TTL'])
+    app.extensions['password_hasher'] = PasswordHasher(app.config['PASSWORD_HASH_METHOD'],
+                                                       workers=app.config['PASSWORD_HASH_WORKERS'],
+                                                       max_pending=app.config['PASSWORD_HASH_MAX_PENDING'],
+                                                       timeout=app.config['PASSWORD_HASH_TIMEOUT'])
+    app.extensions['trend_cache'] = ContentCache(maxsize=app.config['TREND_CACHE_SIZE'],
+                                                 default_ttl=app.config['TREND_CACHE_TTL'])
+    app.extensions['search_cache'] = ContentCache(maxsize=app.config['SEARCH_CACHE_SIZE'],
+                                                  default_ttl=app.config['SEARCH_CACHE_TTL'])
+    app.extensions['admin_count_cache'] = ContentCache(maxsize=256, default_ttl=app.config['ADMIN_COUNT_TTL'])
+    app.extensions['history_archive'] = HistoryArchive(os.path.join(app.instance_path, app.config['ARCHIVE_PATH']))
+    app.extensions['assets'] = AssetManifest(os.path.join(app.static_folder, 'dist'))
+    app.extensions['db_writer'] = GroupCommitWriter(app.app_context, db.session,
+                                                    window=app.config['WRITE_BATCH_WINDOW'] / 1000,
+                                                    max_batch=app.config['WRITE_BATCH_MAX'],
+                                                    timeout=app.config['WRITE_TIMEOUT'])
+    # Commit writes still queued and stop the hashing processes when the process exits
+    atexit.register(app.extensions['db_writer'].shutdown)
+    atexit.register(app.extensions['password_hasher'].shutdown)
+    init_sqlite(app)
+    app.register_blueprint(bp)
+    if app.config['PROFILER_ENABLED']:
+        init_profiler(app)
+    if app.config['ADMIN_ENABLED']:
+        init_admin(app)
+    return app
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    create_app().run(debug=True)
\ No newline at end of file
@@ -0,0 +1,230 @@
+"""Cold storage for old exercise, wellness and progress history.
+
+Archived rows live in a separate SQLite file as compressed columnar
+chunks, one per (kind, user, month): a zlib-compressed JSON object of
+column lists. Each chunk row also carries the summaries the rollups need
+(entry count, exercise minutes, a bitmask of active days, first and last
+timestamps, id range), so rebuilding statistics never decompresses
+anything, and the per-(user, exercise type) progress feedback sums used by
+the recommendation job are kept in their own table.
+
+Storing is idempotent: rows whose id a chunk already holds are skipped,
+so a run interrupted between storing rows here and deleting them from
+the main database can simply be repeated.
+"""
+from datetime import datetime
+import json
+import os
+import sqlite3
+import threading
+import zlib
+
+# Columns kept per kind, besides id, user_id and the entry's timestamp ("at")
+KINDS = {
+    'exercise': ('exercise_type', 'duration', 'notes'),
+    'wellness': ('mood_rating', 'stress_level', 'sleep_hours', 'notes'),
+    'progress': ('exercise_id', 'exercise_type', 'performance_rating', 'energy_level', 'difficulty_felt', 'notes'),
+}
+COMPRESSION_LEVEL = 9
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunk (
+    kind TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    month TEXT NOT NULL,
+    row_count INTEGER NOT NULL,
+    minutes INTEGER NOT NULL,
+    active_days INTEGER NOT NULL,
+    first_at TEXT NOT NULL,
+    last_at TEXT NOT NULL,
+    min_id INTEGER NOT NULL,
+    max_id INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    UNIQUE (kind, user_id, month)
+);
+CREATE TABLE IF NOT EXISTS progress_feedback (
+    user_id INTEGER NOT NULL,
+    exercise_type TEXT,
+    entries INTEGER NOT NULL,
+    performance INTEGER NOT NULL,
+    energy INTEGER NOT NULL,
+    difficulty INTEGER NOT NULL,
+    UNIQUE (user_id, exercise_type)
+);
+"""
+
+
+def _pack(columns):
+    return zlib.compress(json.dumps(columns, separators=(',', ':')).encode(), COMPRESSION_LEVEL)
+
+
+def _unpack(data):
+    return json.loads(zlib.decompress(data))
+
+
+class HistoryArchive:
+    """A compressed SQLite archive file; connections are opened per thread on first use."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode = WAL')  # readers don't wait for the archive job
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def store(self, kind, rows):
+        """Add rows (dicts with id, user_id, at and the kind's columns); returns how many were new.
+
+        Rows are merged into their (user, month) chunk in one transaction.
+        """
+        fields = KINDS[kind]
+        groups = {}
+        for row in rows:
+            groups.setdefault((row['user_id'], row['at'].strftime('%Y-%m')), []).append(row)
+
+        connection = self._connection()
+        added = 0
+        feedback = {}
+        with connection:
+            for (user_id, month), group in groups.items():
+                existing = connection.execute(
+                    'SELECT data FROM chunk WHERE kind = ? AND user_id = ? AND month = ?',
+                    (kind, user_id, month)).fetchone()
+                columns = _unpack(existing[0]) if existing else {name: [] for name in ('id', 'at') + fields}
+                known = set(columns['id'])
+                new = [row for row in group if row['id'] not in known]
+                if not new:
+                    continue
+                for row in new:
+                    columns['id'].append(row['id'])
+                    columns['at'].append(row['at'].isoformat())
+                    for name in fields:
+                        columns[name].append(row[name])
+                    if kind == 'progress':
+                        sums = feedback.setdefault((user_id, row['exercise_type']), [0, 0, 0, 0])
+                        sums[0] += 1
+                        sums[1] += row['performance_rating']
+                        sums[2] += row['energy_level']
+                        sums[3] += row['difficulty_felt']
+                added += len(new)
+
+                days = 0
+                for at in columns['at']:
+                    days |= 1 << (int(at[8:10]) - 1)
+                connection.execute(
+                    'INSERT OR REPLACE INTO chunk (kind, user_id, month, row_count, minutes, active_days, '
+                    'first_at, last_at, min_id, max_id, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (kind, user_id, month, len(columns['id']), sum(columns.get('duration') or [0]), days,
+                     min(columns['at']), max(columns['at']), min(columns['id']), max(columns['id']),
+                     _pack(columns)))
+            connection.executemany(
+                'INSERT INTO progress_feedback VALUES (?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (user_id, exercise_type) DO UPDATE SET entries = entries + excluded.entries, '
+                'performance = performance + excluded.performance, energy = energy + excluded.energy, '
+                'difficulty = difficulty + excluded.difficulty',
+                [(user_id, exercise_type, *sums) for (user_id, exercise_type), sums in feedback.items()])
+        return added
+
+    def iter_rows(self, kind, user_id=None, start=None, end=None, before=None, min_id=None, max_id=None,
+                  newest_first=False):
+        """Yield archived rows as dicts, their ``at`` a datetime.
+
+        Filters: a user; start <= at < end; (at, id) < before; min_id <= id
+        <= max_id. Rows come chunk by chunk, by user and month (newest month
+        first with newest_first); within a chunk, in (at, id) order, or
+        newest first. Only the chunks that can match are decompressed.
+        """
+        if not self.exists():
+            return
+        query = 'SELECT user_id, data FROM chunk WHERE kind = ?'
+        params = [kind]
+        conditions = [
+            (user_id is not None, 'user_id = ?', user_id),
+            (start is not None, 'last_at >= ?', start and start.isoformat()),
+            (end is not None, 'first_at < ?', end and end.isoformat()),
+            (before is not None, 'first_at <= ?', before and before[0].isoformat()),
+            (min_id is not None, 'max_id >= ?', min_id),
+            (max_id is not None, 'min_id <= ?', max_id),
+        ]
+        for applies, condition, value in conditions:
+            if applies:
+                query += f' AND {condition}'
+                params.append(value)
+        direction = 'DESC' if newest_first else ''
+        query += f' ORDER BY user_id {direction}, month {direction}'
+
+        fields = KINDS[kind]
+        for chunk_user_id, data in self._connection().execute(query, params):
+            columns = _unpack(data)
+            rows = []
+            for position, (entry_id, at) in enumerate(zip(columns['id'], columns['at'])):
+                at = datetime.fromisoformat(at)
+                if ((start is not None and at < start) or (end is not None and at >= end)
+                        or (before is not None and (at, entry_id) >= tuple(before))
+                        or (min_id is not None and entry_id < min_id) or (max_id is not None and entry_id > max_id)):
+                    continue
+                row = {'id': entry_id, 'user_id': chunk_user_id, 'at': at}
+                row.update((name, columns[name][position]) for name in fields)
+                rows.append(row)
+            rows.sort(key=lambda row: (row['at'], row['id']), reverse=newest_first)
+            yield from rows
+
+    def user_totals(self):
+        """Yield (kind, user_id, entries, minutes, last at, set of active dates) per archived user and kind.
+
+        Read from the chunk summaries alone.
+        """
+        if not self.exists():
+            return
+        query = ('SELECT kind, user_id, month, row_count, minutes, active_days, last_at '
+                 'FROM chunk ORDER BY kind, user_id')
+        current = None
+        for kind, user_id, month, count, minutes, days, last_at in self._connection().execute(query):
+            if current is None or current[:2] != (kind, user_id):
+                if current is not None:
+                    yield current[:4] + (datetime.fromisoformat(last), active)
+                current, last, active = (kind, user_id, 0, 0), last_at, set()
+            current = (kind, user_id, current[2] + count, current[3] + minutes)
+            last = max(last, last_at)
+            first = datetime.strptime(month, '%Y-%m').date()
+            active.update(first.replace(day=day + 1) for day in range(31) if days >> day & 1)
+        if current is not None:
+            yield current[:4] + (datetime.fromisoformat(last), active)
+
+    def progress_feedback(self, user_ids):
+        """(user_id, exercise_type, entries, performance sum, energy sum, difficulty sum) rows."""
+        if not self.exists() or not user_ids:
+            return []
+        user_ids = list(user_ids)
+        rows = []
+        for start in range(0, len(user_ids), 500):
+            batch = user_ids[start:start + 500]
+            rows += self._connection().execute(
+                f'SELECT * FROM progress_feedback WHERE user_id IN ({", ".join("?" * len(batch))})', batch).fetchall()
+        return rows
+
+    def checkpoint(self):
+        """Fold the write-ahead log into the archive file, e.g. after an archive run."""
+        if self.exists():
+            self._connection().execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+    def stats(self):
+        if not self.exists():
+            return {'path': self.path, 'file_bytes': 0, 'kinds': {}}
+        kinds = {}
+        for kind, chunks, rows, stored in self._connection().execute(
+                'SELECT kind, count(*), sum(row_count), sum(length(data)) FROM chunk GROUP BY kind'):
+            kinds[kind] = {'chunks': chunks, 'rows': rows, 'compressed_bytes': stored}
+        wal = self.path + '-wal'
+        file_bytes = os.path.getsize(self.path) + (os.path.getsize(wal) if os.path.exists(wal) else 0)
+        return {'path': self.path, 'file_bytes': file_bytes, 'kinds': kinds}
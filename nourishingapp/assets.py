@@ -0,0 +1,166 @@
+"""Fingerprinted, precompressed copies of the static files.
+
+``build`` copies every file under static/ into static/dist/ with a content
+hash in its name (``css/app.css`` -> ``css/app.3f9c0b1d2e4a.css``), writes
+gzip and, when the ``brotli`` package is installed, brotli variants next to
+the compressible ones, and records the mapping in ``manifest.json``. Since a
+file's name changes whenever its content does, the copies can be cached by
+browsers forever.
+"""
+import gzip
+import hashlib
+import json
+import os
+import posixpath
+import re
+import shutil
+import threading
+
+try:
+    import brotli
+except ImportError:  # optional; only gzip variants are written without it
+    brotli = None
+
+MANIFEST = 'manifest.json'
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.txt', '.ttf', '.eot'}
+# Below this a compressed variant doesn't save a packet
+MIN_COMPRESS_SIZE = 512
+
+_CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+_SOURCE_MAP = re.compile(rb'\n?(?:/\*# sourceMappingURL=[^\n]*?\*/|//# sourceMappingURL=[^\n]*)')
+
+
+def _hashed_name(path, content):
+    base, ext = posixpath.splitext(path)
+    return f'{base}.{hashlib.sha256(content).hexdigest()[:12]}{ext}'
+
+
+def _rewrite_css_urls(path, css, assets):
+    """Point relative url() references at the fingerprinted copies."""
+    directory = posixpath.dirname(path)
+
+    def replace(match):
+        url = match.group(2).strip()
+        if url.startswith(('data:', 'http:', 'https:', '//', '/', '#')):
+            return match.group(0)
+        target, suffix = re.match(r'([^?#]*)(.*)', url).groups()
+        target = posixpath.normpath(posixpath.join(directory, target))
+        if target not in assets:
+            return match.group(0)
+        # Fingerprinting only renames the file, so the CSS stays in the same directory
+        return f'url({posixpath.relpath(assets[target], directory or ".")}{suffix})'
+
+    return _CSS_URL.sub(replace, css)
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+
+
+def build(static_dir, out_dir):
+    """Rebuild out_dir from static_dir; returns the manifest dict."""
+    out_dir = os.path.abspath(out_dir)
+    sources = []
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.') and os.path.join(os.path.abspath(root), d) != out_dir)
+        for name in sorted(files):
+            if not name.startswith('.'):
+                full = os.path.join(root, name)
+                sources.append((os.path.relpath(full, static_dir).replace(os.sep, '/'), full))
+
+    # CSS goes last so the files it references already have their final names
+    sources.sort(key=lambda source: source[0].endswith('.css'))
+    shutil.rmtree(out_dir, ignore_errors=True)
+    assets = {}
+    compressed = {'gzip': 0, 'br': 0}
+    for path, full in sources:
+        with open(full, 'rb') as f:
+            content = f.read()
+        ext = posixpath.splitext(path)[1].lower()
+        if ext in ('.css', '.js'):
+            # The .map files aren't shipped
+            content = _SOURCE_MAP.sub(b'', content)
+        if ext == '.css':
+            content = _rewrite_css_urls(path, content.decode('utf-8'), assets).encode('utf-8')
+        assets[path] = _hashed_name(path, content)
+        target = os.path.join(out_dir, assets[path])
+        _write(target, content)
+        if ext in COMPRESSIBLE and len(content) >= MIN_COMPRESS_SIZE:
+            _write(target + '.gz', gzip.compress(content, 9, mtime=0))
+            compressed['gzip'] += 1
+            if brotli is not None:
+                _write(target + '.br', brotli.compress(content))
+                compressed['br'] += 1
+
+    manifest = {
+        'version': hashlib.sha256(json.dumps(assets, sort_keys=True).encode()).hexdigest()[:12],
+        'assets': assets,
+    }
+    _write(os.path.join(out_dir, MANIFEST), json.dumps(manifest, indent=2, sort_keys=True).encode())
+    return dict(manifest, compressed=compressed)
+
+
+def tree_fingerprint(directory):
+    """(digest, newest mtime) of every file name and content under directory."""
+    digest = hashlib.sha256()
+    newest = 0
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            full = os.path.join(root, name)
+            digest.update(os.path.relpath(full, directory).encode())
+            with open(full, 'rb') as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+            newest = max(newest, os.path.getmtime(full))
+    return digest.hexdigest()[:12], newest
+
+
+class AssetManifest:
+    """Maps static file names to their fingerprinted copies.
+
+    The manifest is read on first use and kept for the life of the process;
+    run ``flask build-assets`` before (re)starting the app after changing a
+    static file. Without a manifest every lookup misses and pages fall back
+    to the plain /static/ URLs.
+    """
+
+    def __init__(self, out_dir):
+        self.out_dir = out_dir
+        self._assets = None
+        self._built = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._assets is None:
+                try:
+                    with open(os.path.join(self.out_dir, MANIFEST), encoding='utf-8') as f:
+                        manifest = json.load(f)
+                except FileNotFoundError:
+                    manifest = {}
+                self._version = manifest.get('version')
+                self._built = set(manifest.get('assets', {}).values())
+                self._assets = manifest.get('assets', {})
+        return self._assets
+
+    @property
+    def version(self):
+        self._load()
+        return self._version
+
+    def lookup(self, path):
+        """Fingerprinted name for a static file, or None if it wasn't built."""
+        return self._load().get(path)
+
+    def is_built(self, hashed):
+        self._load()
+        return hashed in self._built
+
+    def variant(self, hashed, encoding):
+        """Path of the precompressed variant of a built file, if there is one."""
+        suffix = {'br': '.br', 'gzip': '.gz'}[encoding]
+        path = os.path.join(self.out_dir, *hashed.split('/')) + suffix
+        return path if os.path.isfile(path) else None
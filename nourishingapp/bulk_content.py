@@ -0,0 +1,279 @@
+"""Bulk CSV/JSON import and export of the content tables.
+
+Imports stream the file: rows are read, validated against the table's
+column types and written in chunks, so a large catalog never sits in
+memory. Each chunk is upserted on the table's natural key with two
+set-based statements through a temporary staging table: an UPDATE ...
+FROM for rows whose key exists and has changed, and an INSERT ... SELECT
+for the rest. The whole file is one transaction; any invalid row fails
+the import and leaves the table untouched.
+"""
+import codecs
+import csv
+import io
+import json
+
+from sqlalchemy import Boolean, Integer, String, bindparam, select, text
+
+FORMATS = ('csv', 'json')
+STAGE = 'content_import_stage'
+# Invalid rows listed back to the user; the rest are only counted
+MAX_ERRORS = 20
+_READ_SIZE = 65536
+_TRUE = {'1', 'true', 'yes', 'y', 'on'}
+_FALSE = {'0', 'false', 'no', 'n', 'off'}
+
+
+class InvalidImport(Exception):
+    """The file can't be imported.
+
+    ``errors`` lists (row number, message) pairs, row 0 being the header;
+    ``invalid_rows`` counts the bad rows, listed or not.
+    """
+
+    def __init__(self, errors, invalid_rows=0):
+        super().__init__(f'{invalid_rows} invalid row(s)' if invalid_rows else errors[0][1])
+        self.errors = errors
+        self.invalid_rows = invalid_rows
+
+
+def importable_columns(table):
+    """Columns a file may set: everything but the primary key and timestamps."""
+    return [column for column in table.columns
+            if not column.primary_key and not (column.default is not None and column.default.is_callable)]
+
+
+def _default(column):
+    if column.default is None:
+        return None
+    # Wrapped zero-argument callables take an (unused) execution context
+    return column.default.arg(None) if column.default.is_callable else column.default.arg
+
+
+def _convert(column, value):
+    """Value of the column's Python type, None for blanks; raises ValueError."""
+    if isinstance(value, str):
+        value = value.strip()
+        if value == '':
+            value = None
+    if value is None:
+        return None
+    if isinstance(column.type, Boolean):
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, int) and value in (0, 1):
+            return bool(value)
+        if isinstance(value, str) and value.lower() in _TRUE | _FALSE:
+            return value.lower() in _TRUE
+        raise ValueError('must be true or false')
+    if isinstance(column.type, Integer):
+        if isinstance(value, bool) or not isinstance(value, (int, str)):
+            raise ValueError('must be a whole number')
+        try:
+            return int(value)
+        except ValueError:
+            raise ValueError('must be a whole number') from None
+    if not isinstance(value, str):
+        raise ValueError('must be text')
+    if isinstance(column.type, String) and column.type.length and len(value) > column.type.length:
+        raise ValueError(f'is longer than {column.type.length} characters')
+    return value
+
+
+def _csv_rows(stream):
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    for row in reader:
+        if None in row:
+            raise InvalidImport([(reader.line_num, 'has more values than the header has columns')], 1)
+        yield row
+
+
+def _json_rows(stream):
+    """Objects from a JSON array or from NDJSON, decoded as they arrive."""
+    decoder = json.JSONDecoder()
+    text_reader = codecs.getincrementaldecoder('utf-8-sig')()
+    buffer = ''
+    position = 0
+    number = 0
+    finished = False
+    while True:
+        # Skip whitespace, the array brackets and the commas between objects
+        while position < len(buffer) and (buffer[position].isspace() or buffer[position] in ',[]'):
+            position += 1
+        if position < len(buffer):
+            try:
+                value, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # Most likely an object cut off by the end of the buffer
+                if finished:
+                    raise InvalidImport([(number + 1, 'is not valid JSON')], 1) from None
+            else:
+                number += 1
+                if not isinstance(value, dict):
+                    raise InvalidImport([(number, 'is not a JSON object')], 1)
+                yield value
+                continue
+        if finished:
+            return
+        data = stream.read(_READ_SIZE)
+        buffer = buffer[position:] + text_reader.decode(data, final=not data)
+        position = 0
+        finished = not data
+
+
+def read_rows(stream, file_format):
+    """Rows of a CSV (with a header) or JSON file as dicts, streamed."""
+    if file_format not in FORMATS:
+        raise ValueError(f'format must be one of {", ".join(FORMATS)}')
+    return _csv_rows(stream) if file_format == 'csv' else _json_rows(stream)
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def import_rows(connection, table, key, rows, chunk_size=2000):
+    """Upsert rows into table on the natural key columns ``key``.
+
+    The first row's fields set the columns: those missing from the file
+    keep their value on update and get their default on insert, and a
+    blank value stands for the column's default too. A key repeated in the
+    file is written once, with its last row. Returns counts of rows read,
+    inserted, updated and unchanged; raises InvalidImport (after reading
+    the whole file, to report every problem) without writing anything the
+    caller's rollback won't undo.
+    """
+    importable = {column.name: column for column in importable_columns(table)}
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        raise InvalidImport([(0, 'the file has no rows')])
+    names = list(first)
+    errors = [(0, f'unknown column {name!r}') for name in names if name not in importable]
+    missing = [name for name, column in importable.items()
+               if name not in names and (name in key or (not column.nullable and column.default is None))]
+    errors += [(0, f'missing required column {name!r}') for name in missing]
+    if errors:
+        raise InvalidImport(errors)
+    columns = [importable[name] for name in names]
+    defaults = {column.name: _default(column) for column in columns}
+
+    table_name = _quote(table.name)
+    column_list = ', '.join(_quote(name) for name in names)
+    keys = ' AND '.join(f'{table_name}.{_quote(name)} = s.{_quote(name)}' for name in key)
+    changes = [name for name in names if name not in key]
+    connection.execute(text(f'DROP TABLE IF EXISTS temp.{STAGE}'))
+    connection.execute(text(f'CREATE TEMP TABLE {STAGE} ({column_list}, '
+                            f'PRIMARY KEY ({", ".join(_quote(name) for name in key)}))'))
+    stage_insert = text(f'INSERT OR REPLACE INTO temp.{STAGE} ({column_list}) VALUES '
+                        f'({", ".join(f":c{i}" for i in range(len(names)))})')
+    update = None if not changes else text(
+        f'UPDATE {table_name} SET {", ".join(f"{_quote(name)} = s.{_quote(name)}" for name in changes)} '
+        f'FROM temp.{STAGE} AS s WHERE {keys} AND ('
+        + ' OR '.join(f'{table_name}.{_quote(name)} IS NOT s.{_quote(name)}' for name in changes) + ')')
+    # Columns left out of the file get their defaults on insert
+    extra = [column for name, column in importable.items() if name not in names and column.default is not None]
+    extra += [column for column in table.columns
+              if not column.primary_key and column.name not in importable and column.default is not None]
+    insert = text(
+        f'INSERT INTO {table_name} ({", ".join([column_list] + [_quote(c.name) for c in extra])}) '
+        f'SELECT {", ".join([f"s.{_quote(name)}" for name in names] + [f":d{i}" for i in range(len(extra))])} '
+        f'FROM temp.{STAGE} AS s WHERE NOT EXISTS (SELECT 1 FROM {table_name} WHERE {keys})'
+    ).bindparams(*(bindparam(f'd{i}', _default(column), type_=column.type) for i, column in enumerate(extra)))
+
+    counts = {'rows': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0}
+    invalid = 0
+    chunk = []
+
+    def flush():
+        connection.execute(stage_insert, chunk)
+        staged = connection.execute(text(f'SELECT count(*) FROM temp.{STAGE}')).scalar()
+        updated = connection.execute(update).rowcount if update is not None else 0
+        inserted = connection.execute(insert).rowcount
+        connection.execute(text(f'DELETE FROM temp.{STAGE}'))
+        counts['inserted'] += inserted
+        counts['updated'] += updated
+        counts['unchanged'] += max(0, staged - inserted - updated)
+        chunk.clear()
+
+    number = 0
+    for row in _chain(first, rows):
+        number += 1
+        counts['rows'] += 1
+        values = {}
+        row_errors = []
+        if set(row) - set(names):
+            row_errors.append(f'unknown column(s) {", ".join(sorted(set(row) - set(names)))}')
+        for i, column in enumerate(columns):
+            try:
+                value = _convert(column, row.get(column.name))
+            except ValueError as exc:
+                row_errors.append(f'{column.name} {exc}')
+                continue
+            if value is None:
+                value = defaults[column.name]
+            if value is None and (not column.nullable or column.name in key):
+                row_errors.append(f'{column.name} is required')
+            values[f'c{i}'] = value
+        if row_errors:
+            invalid += 1
+            if len(errors) < MAX_ERRORS:
+                errors.append((number, '; '.join(row_errors)))
+            continue
+        if not errors:
+            chunk.append(values)
+            if len(chunk) >= chunk_size:
+                flush()
+    if errors:
+        raise InvalidImport(errors, invalid)
+    if chunk:
+        flush()
+    connection.execute(text(f'DROP TABLE temp.{STAGE}'))
+    return counts
+
+
+def _chain(first, rest):
+    yield first
+    yield from rest
+
+
+def export_rows(connection, table, file_format, batch_size=1000):
+    """Text chunks of the table's importable columns as CSV or a JSON array.
+
+    Rows are read in primary key order, batch_size at a time, and the
+    output re-imports as an upsert of the same rows.
+    """
+    if file_format not in FORMATS:
+        raise ValueError(f'format must be one of {", ".join(FORMATS)}')
+    columns = importable_columns(table)
+    names = [column.name for column in columns]
+    primary_key = table.primary_key.columns.values()[0]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if file_format == 'csv' else None
+    if writer:
+        writer.writerow(names)
+    else:
+        buffer.write('[')
+    last = None
+    separator = '\n'
+    while True:
+        query = select(primary_key, *columns).order_by(primary_key).limit(batch_size)
+        if last is not None:
+            query = query.where(primary_key > last)
+        batch = connection.execute(query).all()
+        if not batch:
+            break
+        last = batch[-1][0]
+        for row in batch:
+            if writer:
+                writer.writerow(row[1:])
+            else:
+                buffer.write(separator + json.dumps(dict(zip(names, row[1:]))))
+                separator = ',\n'
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if not writer:
+        buffer.write('\n]\n')
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,83 @@
+from collections import OrderedDict
+import threading
+import time
+
+
+class ContentCache:
+    """Size-bounded LRU cache with per-key TTL and a shared version counter.
+
+    The version is owned by the database (see ``ContentVersion`` in app.py);
+    every worker compares it with the version its entries were loaded under
+    and drops everything when they differ, so an admin edit made through one
+    process is visible in all of them on the next request.
+    """
+
+    def __init__(self, maxsize=256, default_ttl=300, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.default_ttl = default_ttl
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def sync_version(self, version):
+        """Clear the cache if the shared content version has moved on."""
+        with self._lock:
+            if version != self.version:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self.version = version
+
+    def get_or_load(self, key, loader, ttl=None):
+        """Return the cached value for key, calling loader() on a miss."""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            version = self.version
+
+        value = loader()
+        expires = now + (self.default_ttl if ttl is None else ttl)
+
+        with self._lock:
+            # Don't store a value loaded under a version that was invalidated meanwhile
+            if version == self.version:
+                self._entries[key] = (expires, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def discard(self, key):
+        """Drop one entry, e.g. after a write that makes it stale."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'version': self.version,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'default_ttl': self.default_ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
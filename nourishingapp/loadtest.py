@@ -0,0 +1,391 @@
+"""Load test every user-facing route against a synthetic population.
+
+Seeds a throwaway SQLite database with N users x M exercise, wellness and
+progress entries plus the content tables, then drives each route through
+the Flask test client and through a multi-threaded WSGI server, reporting
+throughput, p50/p95/p99 latency and SQL queries per request.
+
+    python loadtest.py --users 200 --entries 100 --requests 300 --threads 8
+    python loadtest.py --output results.json --baseline baseline.json
+    python loadtest.py --baseline baseline.json --update-baseline
+    python loadtest.py --routes /log_exercise --config WRITE_BATCH_WINDOW=2
+"""
+import argparse
+from datetime import datetime, timedelta
+import http.client
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import quote, urlencode
+
+from flask import current_app, g, has_request_context
+import sqlalchemy
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+from werkzeug.serving import make_server
+
+from app import (create_app, db, rebuild_user_stats, refresh_recommendations, User, Exercise, WellnessEntry,
+                 ProgressEntry, Tip, MentalTip, RecoveryTip, MentalWellnessResource, ExerciseVideo, ContentVersion)
+
+PASSWORD = 'loadtest-password'
+EXERCISE_TYPES = ['Walking', 'Prenatal Yoga', 'Postnatal Yoga', 'Pilates', 'Pelvic Floor Exercises', 'Swimming']
+INSERT_CHUNK = 5000
+# Content text draws from this vocabulary plus generated filler words, with
+# Zipf-like frequencies, so search sees realistic match sets
+VOCABULARY = ('breathing gentle core pelvic floor strength walking stretch posture sleep baby feeding '
+              'nutrition hydration energy mood anxiety stress calm meditation journal support partner '
+              'recovery healing rest routine yoga pilates swimming balance back pain tension relax '
+              'mindful gratitude hormones iron protein vegetables morning evening nap routine daily '
+              'weekly progress confidence community therapist counseling self-care bonding').split()
+# Cache misses make the per-request mean wobble a little; an N+1 adds at least one
+QUERY_SLACK = 0.5
+
+
+def insert_chunked(model, rows):
+    for start in range(0, len(rows), INSERT_CHUNK):
+        db.session.execute(db.insert(model), rows[start:start + INSERT_CHUNK])
+
+
+def seed(users, entries, content, rng):
+    """Bulk-load the synthetic population; returns the seeded user ids."""
+    now = datetime.utcnow()
+
+    syllables = ['ba', 'ce', 'di', 'fo', 'gu', 'ha', 'ke', 'li', 'mo', 'nu', 'pa', 're', 'si', 'to', 'vu']
+    vocabulary = VOCABULARY + [''.join(rng.choice(syllables) for _ in range(rng.randrange(2, 5)))
+                               for _ in range(2000)]
+    rng.shuffle(vocabulary)
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+
+    def words(count):
+        return ' '.join(rng.choices(vocabulary, weights, k=count)).capitalize() + '.'
+
+    password_hash = generate_password_hash(PASSWORD, current_app.config['PASSWORD_HASH_METHOD'])
+    insert_chunked(User, [
+        dict(username=f'user{i}', email=f'user{i}@example.com', password_hash=password_hash,
+             full_name=f'Load Test User {i}', postpartum_months=i % 13, date_joined=now)
+        for i in range(users)])
+    user_ids = list(db.session.scalars(db.select(User.id).order_by(User.id)))
+
+    def when(n):
+        # Spread each user's entries over roughly one per day, newest first
+        return now - timedelta(days=n, minutes=rng.randrange(1440))
+
+    insert_chunked(Exercise, [
+        dict(user_id=user_id, exercise_type=rng.choice(EXERCISE_TYPES), duration=rng.randrange(5, 60),
+             date_completed=when(n), notes='')
+        for user_id in user_ids for n in range(entries)])
+    insert_chunked(WellnessEntry, [
+        dict(user_id=user_id, mood_rating=rng.randrange(1, 11), stress_level=rng.randrange(1, 11),
+             sleep_hours=round(rng.uniform(3, 9), 1), notes='', date_recorded=when(n))
+        for user_id in user_ids for n in range(entries)])
+    exercises = db.session.execute(db.select(Exercise.id, Exercise.user_id, Exercise.date_completed)).all()
+    insert_chunked(ProgressEntry, [
+        dict(user_id=user_id, exercise_id=exercise_id, performance_rating=rng.randrange(1, 6),
+             energy_level=rng.randrange(1, 11), difficulty_felt=rng.randrange(1, 11), notes='',
+             date_recorded=completed)
+        for exercise_id, user_id, completed in exercises])
+
+    insert_chunked(Tip, [
+        dict(title=f'Tip {i}: {words(3)}', content=words(40), category=rng.choice(['Nutrition', 'Sleep', 'Exercise']))
+        for i in range(content)])
+    insert_chunked(MentalTip, [
+        dict(month_relation=i % 25, tip_content=words(30)) for i in range(content)])
+    insert_chunked(RecoveryTip, [
+        dict(title=f'Recovery Tip {i}: {words(3)}', content=words(40),
+             recovery_stage=('Early', 'Mid', 'Late')[i % 3])
+        for i in range(content)])
+    insert_chunked(MentalWellnessResource, [
+        dict(title=f'Resource {i}: {words(3)}', content=words(60),
+             resource_type=('Article', 'Exercise', 'Meditation')[i % 3],
+             mood_category=('Anxiety', 'Stress', 'General')[i % 3])
+        for i in range(content)])
+    insert_chunked(ExerciseVideo, [
+        dict(exercise_type=EXERCISE_TYPES[i % len(EXERCISE_TYPES)], title=f'Video {i}',
+             video_url=f'https://example.com/video-{i}', description=words(20),
+             difficulty_level=('Beginner', 'Intermediate', 'Advanced')[i % 3], duration=rng.randrange(5, 40))
+        for i in range(content)])
+    db.session.add(ContentVersion(id=1, version=1))
+    db.session.commit()
+    rebuild_user_stats()
+    refresh_recommendations()
+    return user_ids
+
+
+def scenarios(user_ids, rng):
+    """Route name -> factory returning (method, path, form data, user id or None) for one request."""
+    types = itertools.cycle(EXERCISE_TYPES)
+    return {
+        '/dashboard': lambda: ('GET', '/dashboard', None, rng.choice(user_ids)),
+        '/exercise': lambda: ('GET', '/exercise', None, rng.choice(user_ids)),
+        '/log_exercise': lambda: ('POST', '/log_exercise',
+                                  {'exercise_type': rng.choice(EXERCISE_TYPES), 'duration': '20', 'notes': ''},
+                                  rng.choice(user_ids)),
+        '/log_wellness': lambda: ('POST', '/log_wellness',
+                                  {'mood_rating': str(rng.randrange(1, 11)), 'stress_level': str(rng.randrange(1, 11)),
+                                   'sleep_hours': '7', 'notes': ''},
+                                  rng.choice(user_ids)),
+        '/get_exercise_videos/<type>': lambda: ('GET', f'/get_exercise_videos/{next(types)}', None,
+                                                rng.choice(user_ids)),
+        '/recovery': lambda: ('GET', '/recovery', None, rng.choice(user_ids)),
+        '/mental_wellness': lambda: ('GET', '/mental_wellness', None, rng.choice(user_ids)),
+        '/profile': lambda: ('GET', '/profile', None, rng.choice(user_ids)),
+        '/api/history/<kind>': lambda: ('GET', '/api/history/exercises', None, rng.choice(user_ids)),
+        '/api/search': lambda: ('GET', '/api/search?' + urlencode(
+            {'q': ' '.join(rng.choice(VOCABULARY)[:rng.randrange(3, 7)] for _ in range(rng.randrange(1, 3)))}),
+            None, rng.choice(user_ids)),
+        '/login': lambda: ('POST', '/login', {'username': f'user{rng.randrange(len(user_ids))}',
+                                              'password': PASSWORD}, None),
+    }
+
+
+def instrument(app):
+    """Report each request's SQL statement count in an X-Query-Count header."""
+    def count(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context():
+            g.loadtest_queries = g.get('loadtest_queries', 0) + 1
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', count)
+
+    @app.after_request
+    def add_query_count(response):
+        response.headers['X-Query-Count'] = str(g.get('loadtest_queries', 0))
+        return response
+
+
+def session_cookie(app, user_id):
+    """A signed session cookie for user_id, as Flask-Login would have set it."""
+    return app.session_interface.get_signing_serializer(app).dumps({'_user_id': str(user_id), '_fresh': True})
+
+
+def run_test_client(app, make_request, count):
+    """Issue count requests one after another through the test client."""
+    samples = []
+    cookies = {}
+    for _ in range(count):
+        method, path, data, user_id = make_request()
+        client = app.test_client()
+        if user_id is not None:
+            client.set_cookie('session', cookies.get(user_id) or session_cookie(app, user_id))
+        # Fresh app context per request so g and the session aren't shared between them
+        with app.app_context():
+            started = time.perf_counter()
+            response = client.open(path, method=method, data=data, headers={'Accept': 'application/json'})
+            elapsed = time.perf_counter() - started
+        cookie = client.get_cookie('session')
+        if user_id is not None and cookie is not None:
+            cookies[user_id] = cookie.value  # keeps the identity snapshot, as a browser would
+        samples.append((elapsed, response.status_code, int(response.headers.get('X-Query-Count', 0))))
+    return samples, None
+
+
+def run_threaded(port, app, make_request, count, threads):
+    """Issue count requests from `threads` concurrent HTTP clients."""
+    samples = []
+    cookies = {}
+    lock = threading.Lock()
+    remaining = itertools.count()
+
+    def worker():
+        while next(remaining) < count:
+            with lock:
+                method, path, data, user_id = make_request()
+                cookie = cookies.get(user_id) if user_id is not None else None
+            if user_id is not None and cookie is None:
+                cookie = session_cookie(app, user_id)
+            headers = {'Accept': 'application/json'}
+            body = None
+            if cookie:
+                headers['Cookie'] = f'session={cookie}'
+            if data is not None:
+                body = urlencode(data)
+                headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+            started = time.perf_counter()
+            try:
+                connection.request(method, quote(path, safe='/?=&%+'), body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+                queries = int(response.getheader('X-Query-Count', 0))
+                set_cookie = response.getheader('Set-Cookie') or ''
+            except OSError:
+                status, queries, set_cookie = 0, 0, ''
+            finally:
+                connection.close()
+            elapsed = time.perf_counter() - started
+            with lock:
+                if user_id is not None and set_cookie.startswith('session='):
+                    cookies[user_id] = set_cookie.split(';', 1)[0].split('=', 1)[1]
+                samples.append((elapsed, status, queries))
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return samples, time.perf_counter() - started
+
+
+def summarize(samples, wall_time):
+    latencies = sorted(sample[0] for sample in samples)
+    errors = sum(1 for sample in samples if not 200 <= sample[1] < 400)
+    queries = [sample[2] for sample in samples]
+
+    def percentile(p):
+        return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2)
+
+    # Sequential runs: throughput is one request at a time, so use the summed latency
+    wall_time = wall_time if wall_time is not None else sum(latencies)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'throughput_rps': round(len(samples) / wall_time, 1),
+        'p50_ms': percentile(0.5),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'queries_mean': round(sum(queries) / len(queries), 2),
+        'queries_max': max(queries),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Print each route's change against the baseline; returns the regressions."""
+    regressions = []
+    for key in ('users', 'entries', 'content', 'threads'):
+        if baseline.get('meta', {}).get(key) != results['meta'][key]:
+            print(f"warning: baseline was run with {key}={baseline.get('meta', {}).get(key)}, "
+                  f"this run with {key}={results['meta'][key]}")
+    for driver, routes in results['results'].items():
+        for route, current in routes.items():
+            previous = baseline.get('results', {}).get(driver, {}).get(route)
+            if previous is None:
+                continue
+            problems = []
+            if current['queries_mean'] > previous['queries_mean'] + QUERY_SLACK:
+                problems.append(f"queries {previous['queries_mean']} -> {current['queries_mean']}")
+            if current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+                problems.append(f"p95 {previous['p95_ms']} -> {current['p95_ms']} ms")
+            if current['throughput_rps'] < previous['throughput_rps'] * (1 - tolerance):
+                problems.append(f"throughput {previous['throughput_rps']} -> {current['throughput_rps']} rps")
+            if current['errors'] > previous['errors']:
+                problems.append(f"errors {previous['errors']} -> {current['errors']}")
+            if problems:
+                print(f'FAIL {driver:11} {route:28} ' + '; '.join(problems))
+            else:
+                print(f"ok   {driver:11} {route:28} p95 {previous['p95_ms']} -> {current['p95_ms']} ms")
+            regressions.extend(f'{driver} {route}: {problem}' for problem in problems)
+    return regressions
+
+
+def config_value(option):
+    """KEY=VALUE from --config; the value is read as JSON when it parses."""
+    key, separator, value = option.partition('=')
+    if not separator:
+        raise argparse.ArgumentTypeError(f'expected KEY=VALUE, got {option!r}')
+    try:
+        return key, json.loads(value)
+    except ValueError:
+        return key, value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n', 1)[0])
+    parser.add_argument('--users', type=int, default=100, help='synthetic users (default: %(default)s)')
+    parser.add_argument('--entries', type=int, default=100,
+                        help='exercise, wellness and progress entries per user (default: %(default)s)')
+    parser.add_argument('--content', type=int, default=50, help='rows per content table (default: %(default)s)')
+    parser.add_argument('--requests', type=int, default=200, help='requests per route and driver (default: %(default)s)')
+    parser.add_argument('--threads', type=int, default=8, help='concurrent clients for the WSGI run (default: %(default)s)')
+    parser.add_argument('--routes', nargs='*', help='only run these routes (names as printed)')
+    parser.add_argument('--config', type=config_value, action='append', default=[], metavar='KEY=VALUE',
+                        help='app setting to override, e.g. WRITE_BATCH_WINDOW=2 (repeatable)')
+    parser.add_argument('--seed', type=int, default=0, help='random seed (default: %(default)s)')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--baseline', help='compare against this results file')
+    parser.add_argument('--update-baseline', action='store_true', help='overwrite --baseline with these results')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed p95/throughput change before a route counts as regressed (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as workdir:
+        app = create_app(dict(args.config, SQLALCHEMY_DATABASE_URI='sqlite:///' + os.path.join(workdir, 'loadtest.db')))
+        instrument(app)
+        with app.app_context():
+            started = time.perf_counter()
+            db.create_all()
+            user_ids = seed(args.users, args.entries, args.content, rng)
+            seed_seconds = time.perf_counter() - started
+        print(f'Seeded {len(user_ids)} users x {args.entries} entries in {seed_seconds:.1f}s')
+
+        routes = scenarios(user_ids, rng)
+        if args.routes:
+            routes = {name: routes[name] for name in args.routes}
+
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)  # no access log per request
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        serving = threading.Thread(target=server.serve_forever, daemon=True)
+        serving.start()
+        results = {'test_client': {}, 'threaded': {}}
+        try:
+            print(f'{"driver":11} {"route":28} {"rps":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} '
+                  f'{"queries":>8} {"errors":>6}')
+            for name, make_request in routes.items():
+                run_test_client(app, make_request, min(10, args.requests))  # warm caches and pools
+                for driver, run in (
+                        ('test_client', lambda: run_test_client(app, make_request, args.requests)),
+                        ('threaded', lambda: run_threaded(server.port, app, make_request, args.requests,
+                                                          args.threads))):
+                    summary = summarize(*run())
+                    results[driver][name] = summary
+                    print(f'{driver:11} {name:28} {summary["throughput_rps"]:8} {summary["p50_ms"]:8} '
+                          f'{summary["p95_ms"]:8} {summary["p99_ms"]:8} {summary["queries_mean"]:8} '
+                          f'{summary["errors"]:6}')
+        finally:
+            server.shutdown()
+            app.extensions['password_hasher'].shutdown()
+            app.extensions['db_writer'].shutdown()
+            with app.app_context():
+                db.engine.dispose()
+
+    report = {
+        'meta': {
+            'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+            'users': args.users, 'entries': args.entries, 'content': args.content,
+            'requests': args.requests, 'threads': args.threads, 'seed': args.seed, 'config': dict(args.config),
+            'seed_seconds': round(seed_seconds, 2),
+            'python': platform.python_version(), 'sqlalchemy': sqlalchemy.__version__,
+            'sqlite': sqlite3.sqlite_version,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline and args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'Baseline written to {args.baseline}')
+    elif args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f'{len(regressions)} regression(s) against {args.baseline}')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,38 @@
+"""add sync receipts
+
+Revision ID: 1a9f5c3e8b46
+Revises: e7b3d0c6a925
+Create Date: 2026-10-17 12:40:17.503381
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1a9f5c3e8b46'
+down_revision = 'e7b3d0c6a925'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Older versions of app.py ran db.create_all() on import, which may have
+    # created the table before this migration got to run
+    if sa.inspect(op.get_bind()).has_table('sync_receipt'):
+        return
+    op.create_table('sync_receipt',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('idempotency_key', sa.String(length=64), nullable=False),
+    sa.Column('entry_type', sa.String(length=20), nullable=False),
+    sa.Column('entry_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'idempotency_key', name='uq_sync_receipt_user_id_idempotency_key')
+    )
+
+
+def downgrade():
+    op.drop_table('sync_receipt')
@@ -0,0 +1,125 @@
+"""initial schema
+
+Revision ID: 3f1c2a9b7d10
+Revises: 
+Create Date: 2026-10-17 09:12:41.108233
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9b7d10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(length=80), nullable=False),
+    sa.Column('email', sa.String(length=120), nullable=False),
+    sa.Column('password_hash', sa.String(length=120), nullable=False),
+    sa.Column('full_name', sa.String(length=100), nullable=False),
+    sa.Column('date_joined', sa.DateTime(), nullable=True),
+    sa.Column('postpartum_months', sa.Integer(), nullable=True),
+    sa.Column('is_admin', sa.Boolean(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('email'),
+    sa.UniqueConstraint('username')
+    )
+    op.create_table('tip',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=100), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('category', sa.String(length=50), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('mental_tip',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('month_relation', sa.Integer(), nullable=False),
+    sa.Column('tip_content', sa.Text(), nullable=False),
+    sa.Column('date_created', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('recovery_tip',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=100), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('recovery_stage', sa.String(length=50), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('mental_wellness_resource',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=100), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('resource_type', sa.String(length=50), nullable=False),
+    sa.Column('mood_category', sa.String(length=50), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('exercise_video',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('exercise_type', sa.String(length=100), nullable=False),
+    sa.Column('title', sa.String(length=150), nullable=False),
+    sa.Column('video_url', sa.String(length=500), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('difficulty_level', sa.String(length=20), nullable=True),
+    sa.Column('duration', sa.Integer(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('exercise',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('exercise_type', sa.String(length=100), nullable=False),
+    sa.Column('duration', sa.Integer(), nullable=False),
+    sa.Column('date_completed', sa.DateTime(), nullable=True),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('wellness_entry',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('mood_rating', sa.Integer(), nullable=False),
+    sa.Column('stress_level', sa.Integer(), nullable=False),
+    sa.Column('sleep_hours', sa.Float(), nullable=True),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('date_recorded', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('progress_entry',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('exercise_id', sa.Integer(), nullable=False),
+    sa.Column('performance_rating', sa.Integer(), nullable=False),
+    sa.Column('energy_level', sa.Integer(), nullable=False),
+    sa.Column('difficulty_felt', sa.Integer(), nullable=False),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('date_recorded', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['exercise_id'], ['exercise.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('progress_entry')
+    op.drop_table('wellness_entry')
+    op.drop_table('exercise')
+    op.drop_table('exercise_video')
+    op.drop_table('mental_wellness_resource')
+    op.drop_table('recovery_tip')
+    op.drop_table('mental_tip')
+    op.drop_table('tip')
+    op.drop_table('user')
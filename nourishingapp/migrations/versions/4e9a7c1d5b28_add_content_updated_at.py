@@ -0,0 +1,38 @@
+"""add content_version.updated_at
+
+Revision ID: 4e9a7c1d5b28
+Revises: f2a8c4e1b973
+Create Date: 2026-10-17 20:14:52.318406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4e9a7c1d5b28'
+down_revision = 'f2a8c4e1b973'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('content_version', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    # Until the next admin edit, the newest content row is the best guess
+    op.execute("""
+        UPDATE content_version SET updated_at = (
+            SELECT max(created_at) FROM (
+                SELECT max(created_at) AS created_at FROM tip
+                UNION ALL SELECT max(created_at) FROM recovery_tip
+                UNION ALL SELECT max(created_at) FROM mental_wellness_resource
+                UNION ALL SELECT max(created_at) FROM exercise_video
+            )
+        )
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('content_version', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,38 @@
+"""add user_id indexes for id-ordered exports
+
+Revision ID: 5b0d8a4c2e67
+Revises: 1a9f5c3e8b46
+Create Date: 2026-10-17 13:55:36.190827
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b0d8a4c2e67'
+down_revision = '1a9f5c3e8b46'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('exercise', schema=None) as batch_op:
+        batch_op.create_index('ix_exercise_user_id', ['user_id'], unique=False)
+
+    with op.batch_alter_table('wellness_entry', schema=None) as batch_op:
+        batch_op.create_index('ix_wellness_entry_user_id', ['user_id'], unique=False)
+
+    with op.batch_alter_table('progress_entry', schema=None) as batch_op:
+        batch_op.create_index('ix_progress_entry_user_id', ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('progress_entry', schema=None) as batch_op:
+        batch_op.drop_index('ix_progress_entry_user_id')
+
+    with op.batch_alter_table('wellness_entry', schema=None) as batch_op:
+        batch_op.drop_index('ix_wellness_entry_user_id')
+
+    with op.batch_alter_table('exercise', schema=None) as batch_op:
+        batch_op.drop_index('ix_exercise_user_id')
@@ -0,0 +1,44 @@
+"""add precomputed video recommendations
+
+Revision ID: 7c3e9b2d4f61
+Revises: a6d2f8b3c917
+Create Date: 2026-10-17 22:31:08.604217
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c3e9b2d4f61'
+down_revision = 'a6d2f8b3c917'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('recommendation_state',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('progress_count', sa.Integer(), nullable=False),
+    sa.Column('postpartum_months', sa.Integer(), nullable=False),
+    sa.Column('content_version', sa.Integer(), nullable=False),
+    sa.Column('computed_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_table('video_recommendation',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('rank', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('video_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('reason', sa.String(length=150), nullable=False),
+    sa.Column('computed_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.ForeignKeyConstraint(['video_id'], ['exercise_video.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'rank')
+    )
+
+
+def downgrade():
+    op.drop_table('video_recommendation')
+    op.drop_table('recommendation_state')
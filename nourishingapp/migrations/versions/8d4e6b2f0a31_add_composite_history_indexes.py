@@ -0,0 +1,64 @@
+"""add composite history and content indexes
+
+Revision ID: 8d4e6b2f0a31
+Revises: 3f1c2a9b7d10
+Create Date: 2026-10-17 09:31:05.562914
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d4e6b2f0a31'
+down_revision = '3f1c2a9b7d10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('exercise', schema=None) as batch_op:
+        batch_op.create_index('ix_exercise_user_id_date_completed', ['user_id', sa.text('date_completed DESC')], unique=False)
+
+    with op.batch_alter_table('wellness_entry', schema=None) as batch_op:
+        batch_op.create_index('ix_wellness_entry_user_id_date_recorded', ['user_id', sa.text('date_recorded DESC')], unique=False)
+
+    with op.batch_alter_table('progress_entry', schema=None) as batch_op:
+        batch_op.create_index('ix_progress_entry_user_id_date_recorded', ['user_id', sa.text('date_recorded DESC')], unique=False)
+        batch_op.create_index('ix_progress_entry_exercise_id', ['exercise_id'], unique=False)
+
+    with op.batch_alter_table('mental_tip', schema=None) as batch_op:
+        batch_op.create_index('ix_mental_tip_month_relation', ['month_relation'], unique=False)
+
+    with op.batch_alter_table('recovery_tip', schema=None) as batch_op:
+        batch_op.create_index('ix_recovery_tip_is_active_recovery_stage', ['is_active', 'recovery_stage'], unique=False)
+
+    with op.batch_alter_table('mental_wellness_resource', schema=None) as batch_op:
+        batch_op.create_index('ix_mental_wellness_resource_is_active', ['is_active'], unique=False)
+
+    with op.batch_alter_table('exercise_video', schema=None) as batch_op:
+        batch_op.create_index('ix_exercise_video_is_active_exercise_type', ['is_active', 'exercise_type'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('exercise_video', schema=None) as batch_op:
+        batch_op.drop_index('ix_exercise_video_is_active_exercise_type')
+
+    with op.batch_alter_table('mental_wellness_resource', schema=None) as batch_op:
+        batch_op.drop_index('ix_mental_wellness_resource_is_active')
+
+    with op.batch_alter_table('recovery_tip', schema=None) as batch_op:
+        batch_op.drop_index('ix_recovery_tip_is_active_recovery_stage')
+
+    with op.batch_alter_table('mental_tip', schema=None) as batch_op:
+        batch_op.drop_index('ix_mental_tip_month_relation')
+
+    with op.batch_alter_table('progress_entry', schema=None) as batch_op:
+        batch_op.drop_index('ix_progress_entry_exercise_id')
+        batch_op.drop_index('ix_progress_entry_user_id_date_recorded')
+
+    with op.batch_alter_table('wellness_entry', schema=None) as batch_op:
+        batch_op.drop_index('ix_wellness_entry_user_id_date_recorded')
+
+    with op.batch_alter_table('exercise', schema=None) as batch_op:
+        batch_op.drop_index('ix_exercise_user_id_date_completed')
@@ -0,0 +1,44 @@
+"""add id tie-breaker to history indexes for keyset pagination
+
+Revision ID: 9c6e1f7a3d52
+Revises: 5b0d8a4c2e67
+Create Date: 2026-10-17 15:08:44.672015
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c6e1f7a3d52'
+down_revision = '5b0d8a4c2e67'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('exercise', schema=None) as batch_op:
+        batch_op.drop_index('ix_exercise_user_id_date_completed')
+        batch_op.create_index('ix_exercise_user_id_date_completed_id', ['user_id', sa.text('date_completed DESC'), sa.text('id DESC')], unique=False)
+
+    with op.batch_alter_table('wellness_entry', schema=None) as batch_op:
+        batch_op.drop_index('ix_wellness_entry_user_id_date_recorded')
+        batch_op.create_index('ix_wellness_entry_user_id_date_recorded_id', ['user_id', sa.text('date_recorded DESC'), sa.text('id DESC')], unique=False)
+
+    with op.batch_alter_table('progress_entry', schema=None) as batch_op:
+        batch_op.drop_index('ix_progress_entry_user_id_date_recorded')
+        batch_op.create_index('ix_progress_entry_user_id_date_recorded_id', ['user_id', sa.text('date_recorded DESC'), sa.text('id DESC')], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('progress_entry', schema=None) as batch_op:
+        batch_op.drop_index('ix_progress_entry_user_id_date_recorded_id')
+        batch_op.create_index('ix_progress_entry_user_id_date_recorded', ['user_id', sa.text('date_recorded DESC')], unique=False)
+
+    with op.batch_alter_table('wellness_entry', schema=None) as batch_op:
+        batch_op.drop_index('ix_wellness_entry_user_id_date_recorded_id')
+        batch_op.create_index('ix_wellness_entry_user_id_date_recorded', ['user_id', sa.text('date_recorded DESC')], unique=False)
+
+    with op.batch_alter_table('exercise', schema=None) as batch_op:
+        batch_op.drop_index('ix_exercise_user_id_date_completed_id')
+        batch_op.create_index('ix_exercise_user_id_date_completed', ['user_id', sa.text('date_completed DESC')], unique=False)
@@ -0,0 +1,272 @@
+"""add content full-text search index
+
+Revision ID: a6d2f8b3c917
+Revises: 4e9a7c1d5b28
+Create Date: 2026-10-17 21:05:37.512093
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6d2f8b3c917'
+down_revision = '4e9a7c1d5b28'
+branch_labels = None
+depends_on = None
+
+# The index as of this revision, spelled out rather than built by
+# search_index.py, so later changes there don't change this migration.
+# An entry's rowid is its source row's id * 8 + a code for the table.
+TABLES = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS content_search USING fts5(
+        title, body, tags, tokenize='porter unicode61 remove_diacritics 2', prefix='3'
+    )
+    """,
+    # Stored in the index's config, so ORDER BY rank uses the column weights
+    "INSERT INTO content_search (content_search, rank) VALUES ('rank', 'bm25(8.0, 1.0, 4.0)')",
+    'CREATE TABLE IF NOT EXISTS content_search_facet (id INTEGER PRIMARY KEY, category TEXT, difficulty TEXT)',
+]
+
+# Keep the index current however a content row is written
+TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS content_search_tip_insert AFTER INSERT ON tip BEGIN
+        INSERT INTO content_search (rowid, title, body, tags)
+        SELECT new.id * 8 + 1, new.title, new.content, new.category
+        WHERE coalesce(new.is_active, 1);
+        INSERT INTO content_search_facet (id, category, difficulty)
+        SELECT new.id * 8 + 1, new.category, NULL
+        WHERE coalesce(new.is_active, 1);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS content_search_tip_update AFTER UPDATE ON tip BEGIN
+        DELETE FROM content_search WHERE rowid = old.id * 8 + 1;
+        DELETE FROM content_search_facet WHERE id = old.id * 8 + 1;
+        INSERT INTO content_search (rowid, title, body, tags)
+        SELECT new.id * 8 + 1, new.title, new.content, new.category
+        WHERE coalesce(new.is_active, 1);
+        INSERT INTO content_search_facet (id, category, difficulty)
+        SELECT new.id * 8 + 1, new.category, NULL
+        WHERE coalesce(new.is_active, 1);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS content_search_tip_delete AFTER DELETE ON tip BEGIN
+        DELETE FROM content_search WHERE rowid = old.id * 8 + 1;
+        DELETE FROM content_search_facet WHERE id = old.id * 8 + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS content_search_mental_tip_insert AFTER INSERT ON mental_tip BEGIN
+        INSERT INTO content_search (rowid, title, body, tags)
+        SELECT new.id * 8 + 2, 'Month ' || new.month_relation, new.tip_content, 'Month ' || new.month_relation
+        WHERE 1;
+        INSERT INTO content_search_facet (id, category, difficulty)
+        SELECT new.id * 8 + 2, 'Month ' || new.month_relation, NULL
+        WHERE 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS content_search_mental_tip_update AFTER UPDATE ON mental_tip BEGIN
+        DELETE FROM content_search WHERE rowid = old.id * 8 + 2;
+        DELETE FROM content_search_facet WHERE id = old.id * 8 + 2;
+        INSERT INTO content_search (rowid, title, body, tags)
+        SELECT new.id * 8 + 2, 'Month ' || new.month_relation, new.tip_content, 'Month ' || new.month_relation
+        WHERE 1;
+        INSERT INTO content_search_facet (id, category, difficulty)
+        SELECT new.id * 8 + 2, 'Month ' || new.month_relation, NULL
+        WHERE 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS content_search_mental_tip_delete AFTER DELETE ON mental_tip BEGIN
+        DELETE FROM content_search WHERE rowid = old.id * 8 + 2;
+        DELETE FROM content_search_facet WHERE id = old.id * 8 + 2;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS content_search_recovery_tip_insert AFTER INSERT ON recovery_tip BEGIN
+        INSERT INTO content_search (rowid, title, body, tags)
+        SELECT new.id * 8 + 3, new.title, new.content, new.recovery_stage
+        WHERE coalesce(new.is_active, 1);
+        INSERT INTO content_search_facet (id, category, difficulty)
+        SELECT new.id * 8 + 3, new.recovery_stage, NULL
+        WHERE coalesce(new.is_active, 1);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS content_search_recovery_tip_update AFTER UPDATE ON recovery_tip BEGIN
+        DELETE FROM content_search WHERE rowid = old.id * 8 + 3;
+        DELETE FROM content_search_facet WHERE id = old.id * 8 + 3;
+        INSERT INTO content_search (rowid, title, body, tags)
+        SELECT new.id * 8 + 3, new.title, new.content, new.recovery_stage
+        WHERE coalesce(new.is_active, 1);
+        INSERT INTO content_search_facet (id, category, difficulty)
+        SELECT new.id * 8 + 3, new.recovery_stage, NULL
+        WHERE coalesce(new.is_active, 1);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS content_search_recovery_tip_delete AFTER DELETE ON recovery_tip BEGIN
+        DELETE FROM content_search WHERE rowid = old.id * 8 + 3;
+        DELETE FROM content_search_facet WHERE id = old.id * 8 + 3;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS content_search_mental_wellness_resource_insert AFTER INSERT ON mental_wellness_resource BEGIN
+        INSERT INTO content_search (rowid, title, body, tags)
+        SELECT new.id * 8 + 4, new.title, new.content, new.resource_type || ' ' || coalesce(new.mood_category, '')
+        WHERE coalesce(new.is_active, 1);
+        INSERT INTO content_search_facet (id, category, difficulty)
+        SELECT new.id * 8 + 4, new.resource_type, NULL
+        WHERE coalesce(new.is_active, 1);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS content_search_mental_wellness_resource_update AFTER UPDATE ON mental_wellness_resource BEGIN
+        DELETE FROM content_search WHERE rowid = old.id * 8 + 4;
+        DELETE FROM content_search_facet WHERE id = old.id * 8 + 4;
+        INSERT INTO content_search (rowid, title, body, tags)
+        SELECT new.id * 8 + 4, new.title, new.content, new.resource_type || ' ' || coalesce(new.mood_category, '')
+        WHERE coalesce(new.is_active, 1);
+        INSERT INTO content_search_facet (id, category, difficulty)
+        SELECT new.id * 8 + 4, new.resource_type, NULL
+        WHERE coalesce(new.is_active, 1);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS content_search_mental_wellness_resource_delete AFTER DELETE ON mental_wellness_resource BEGIN
+        DELETE FROM content_search WHERE rowid = old.id * 8 + 4;
+        DELETE FROM content_search_facet WHERE id = old.id * 8 + 4;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS content_search_exercise_video_insert AFTER INSERT ON exercise_video BEGIN
+        INSERT INTO content_search (rowid, title, body, tags)
+        SELECT new.id * 8 + 5, new.title, coalesce(new.description, ''), new.exercise_type
+        WHERE coalesce(new.is_active, 1);
+        INSERT INTO content_search_facet (id, category, difficulty)
+        SELECT new.id * 8 + 5, new.exercise_type, new.difficulty_level
+        WHERE coalesce(new.is_active, 1);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS content_search_exercise_video_update AFTER UPDATE ON exercise_video BEGIN
+        DELETE FROM content_search WHERE rowid = old.id * 8 + 5;
+        DELETE FROM content_search_facet WHERE id = old.id * 8 + 5;
+        INSERT INTO content_search (rowid, title, body, tags)
+        SELECT new.id * 8 + 5, new.title, coalesce(new.description, ''), new.exercise_type
+        WHERE coalesce(new.is_active, 1);
+        INSERT INTO content_search_facet (id, category, difficulty)
+        SELECT new.id * 8 + 5, new.exercise_type, new.difficulty_level
+        WHERE coalesce(new.is_active, 1);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS content_search_exercise_video_delete AFTER DELETE ON exercise_video BEGIN
+        DELETE FROM content_search WHERE rowid = old.id * 8 + 5;
+        DELETE FROM content_search_facet WHERE id = old.id * 8 + 5;
+    END
+    """,
+]
+
+# Index the active content that's already there
+BACKFILL = [
+    """
+    INSERT INTO content_search (rowid, title, body, tags)
+    SELECT tip.id * 8 + 1, tip.title, tip.content, tip.category
+    FROM tip
+    WHERE coalesce(tip.is_active, 1)
+    """,
+    """
+    INSERT INTO content_search_facet (id, category, difficulty)
+    SELECT tip.id * 8 + 1, tip.category, NULL
+    FROM tip
+    WHERE coalesce(tip.is_active, 1)
+    """,
+    """
+    INSERT INTO content_search (rowid, title, body, tags)
+    SELECT mental_tip.id * 8 + 2, 'Month ' || mental_tip.month_relation, mental_tip.tip_content, 'Month ' || mental_tip.month_relation
+    FROM mental_tip
+    WHERE 1
+    """,
+    """
+    INSERT INTO content_search_facet (id, category, difficulty)
+    SELECT mental_tip.id * 8 + 2, 'Month ' || mental_tip.month_relation, NULL
+    FROM mental_tip
+    WHERE 1
+    """,
+    """
+    INSERT INTO content_search (rowid, title, body, tags)
+    SELECT recovery_tip.id * 8 + 3, recovery_tip.title, recovery_tip.content, recovery_tip.recovery_stage
+    FROM recovery_tip
+    WHERE coalesce(recovery_tip.is_active, 1)
+    """,
+    """
+    INSERT INTO content_search_facet (id, category, difficulty)
+    SELECT recovery_tip.id * 8 + 3, recovery_tip.recovery_stage, NULL
+    FROM recovery_tip
+    WHERE coalesce(recovery_tip.is_active, 1)
+    """,
+    """
+    INSERT INTO content_search (rowid, title, body, tags)
+    SELECT mental_wellness_resource.id * 8 + 4, mental_wellness_resource.title, mental_wellness_resource.content, mental_wellness_resource.resource_type || ' ' || coalesce(mental_wellness_resource.mood_category, '')
+    FROM mental_wellness_resource
+    WHERE coalesce(mental_wellness_resource.is_active, 1)
+    """,
+    """
+    INSERT INTO content_search_facet (id, category, difficulty)
+    SELECT mental_wellness_resource.id * 8 + 4, mental_wellness_resource.resource_type, NULL
+    FROM mental_wellness_resource
+    WHERE coalesce(mental_wellness_resource.is_active, 1)
+    """,
+    """
+    INSERT INTO content_search (rowid, title, body, tags)
+    SELECT exercise_video.id * 8 + 5, exercise_video.title, coalesce(exercise_video.description, ''), exercise_video.exercise_type
+    FROM exercise_video
+    WHERE coalesce(exercise_video.is_active, 1)
+    """,
+    """
+    INSERT INTO content_search_facet (id, category, difficulty)
+    SELECT exercise_video.id * 8 + 5, exercise_video.exercise_type, exercise_video.difficulty_level
+    FROM exercise_video
+    WHERE coalesce(exercise_video.is_active, 1)
+    """,
+]
+
+
+def upgrade():
+    # db.create_all() creates the index as well, so it may already exist
+    for statement in TABLES + TRIGGERS:
+        op.execute(statement)
+    op.execute('DELETE FROM content_search')
+    op.execute('DELETE FROM content_search_facet')
+    for statement in BACKFILL:
+        op.execute(statement)
+    op.execute("INSERT INTO content_search (content_search) VALUES ('optimize')")
+
+
+def downgrade():
+    for trigger in (
+        'content_search_tip_insert',
+        'content_search_tip_update',
+        'content_search_tip_delete',
+        'content_search_mental_tip_insert',
+        'content_search_mental_tip_update',
+        'content_search_mental_tip_delete',
+        'content_search_recovery_tip_insert',
+        'content_search_recovery_tip_update',
+        'content_search_recovery_tip_delete',
+        'content_search_mental_wellness_resource_insert',
+        'content_search_mental_wellness_resource_update',
+        'content_search_mental_wellness_resource_delete',
+        'content_search_exercise_video_insert',
+        'content_search_exercise_video_update',
+        'content_search_exercise_video_delete',
+    ):
+        op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    op.execute('DROP TABLE IF EXISTS content_search_facet')
+    op.execute('DROP TABLE IF EXISTS content_search')
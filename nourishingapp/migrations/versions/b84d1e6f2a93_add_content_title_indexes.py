@@ -0,0 +1,44 @@
+"""add content title indexes for bulk import
+
+Revision ID: b84d1e6f2a93
+Revises: 7c3e9b2d4f61
+Create Date: 2026-10-17 23:42:19.027531
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b84d1e6f2a93'
+down_revision = '7c3e9b2d4f61'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('exercise_video', schema=None) as batch_op:
+        batch_op.create_index('ix_exercise_video_title', ['title'], unique=False)
+
+    with op.batch_alter_table('mental_wellness_resource', schema=None) as batch_op:
+        batch_op.create_index('ix_mental_wellness_resource_title', ['title'], unique=False)
+
+    with op.batch_alter_table('recovery_tip', schema=None) as batch_op:
+        batch_op.create_index('ix_recovery_tip_title', ['title'], unique=False)
+
+    with op.batch_alter_table('tip', schema=None) as batch_op:
+        batch_op.create_index('ix_tip_title', ['title'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('tip', schema=None) as batch_op:
+        batch_op.drop_index('ix_tip_title')
+
+    with op.batch_alter_table('recovery_tip', schema=None) as batch_op:
+        batch_op.drop_index('ix_recovery_tip_title')
+
+    with op.batch_alter_table('mental_wellness_resource', schema=None) as batch_op:
+        batch_op.drop_index('ix_mental_wellness_resource_title')
+
+    with op.batch_alter_table('exercise_video', schema=None) as batch_op:
+        batch_op.drop_index('ix_exercise_video_title')
@@ -0,0 +1,40 @@
+"""add user stats rollup
+
+Revision ID: c52a7e91f4b8
+Revises: 8d4e6b2f0a31
+Create Date: 2026-10-17 10:04:52.317760
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c52a7e91f4b8'
+down_revision = '8d4e6b2f0a31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Older versions of app.py ran db.create_all() on import, which may have
+    # created the table before this migration got to run
+    if sa.inspect(op.get_bind()).has_table('user_stats'):
+        return
+    op.create_table('user_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('exercise_count', sa.Integer(), nullable=False),
+    sa.Column('total_minutes', sa.Integer(), nullable=False),
+    sa.Column('wellness_count', sa.Integer(), nullable=False),
+    sa.Column('progress_count', sa.Integer(), nullable=False),
+    sa.Column('last_activity_at', sa.DateTime(), nullable=True),
+    sa.Column('last_active_date', sa.Date(), nullable=True),
+    sa.Column('current_streak', sa.Integer(), nullable=False),
+    sa.Column('longest_streak', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade():
+    op.drop_table('user_stats')
@@ -0,0 +1,46 @@
+"""add indexes for keyset-paged admin lists
+
+Revision ID: d3f9a1c7e5b2
+Revises: b84d1e6f2a93
+Create Date: 2026-10-18 00:36:51.214608
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3f9a1c7e5b2'
+down_revision = 'b84d1e6f2a93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('exercise', schema=None) as batch_op:
+        batch_op.create_index('ix_exercise_date_completed_id', ['date_completed', 'id'], unique=False)
+        batch_op.create_index('ix_exercise_exercise_type_date_completed_id', ['exercise_type', 'date_completed', 'id'], unique=False)
+
+    with op.batch_alter_table('progress_entry', schema=None) as batch_op:
+        batch_op.create_index('ix_progress_entry_date_recorded_id', ['date_recorded', 'id'], unique=False)
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.create_index('ix_user_date_joined_id', ['date_joined', 'id'], unique=False)
+
+    with op.batch_alter_table('wellness_entry', schema=None) as batch_op:
+        batch_op.create_index('ix_wellness_entry_date_recorded_id', ['date_recorded', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('wellness_entry', schema=None) as batch_op:
+        batch_op.drop_index('ix_wellness_entry_date_recorded_id')
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_date_joined_id')
+
+    with op.batch_alter_table('progress_entry', schema=None) as batch_op:
+        batch_op.drop_index('ix_progress_entry_date_recorded_id')
+
+    with op.batch_alter_table('exercise', schema=None) as batch_op:
+        batch_op.drop_index('ix_exercise_exercise_type_date_completed_id')
+        batch_op.drop_index('ix_exercise_date_completed_id')
@@ -0,0 +1,70 @@
+"""copy exercise_type onto progress entries and index the admin filters
+
+Revision ID: e5a0c7d2b419
+Revises: d3f9a1c7e5b2
+Create Date: 2026-10-18 09:14:27.630518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a0c7d2b419'
+down_revision = 'd3f9a1c7e5b2'
+branch_labels = None
+depends_on = None
+
+TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS progress_entry_exercise_type_insert AFTER INSERT ON progress_entry BEGIN
+        UPDATE progress_entry SET exercise_type = (SELECT exercise_type FROM exercise WHERE id = new.exercise_id)
+        WHERE id = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS progress_entry_exercise_type_update AFTER UPDATE OF exercise_id ON progress_entry BEGIN
+        UPDATE progress_entry SET exercise_type = (SELECT exercise_type FROM exercise WHERE id = new.exercise_id)
+        WHERE id = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS exercise_exercise_type_update AFTER UPDATE OF exercise_type ON exercise BEGIN
+        UPDATE progress_entry SET exercise_type = new.exercise_type WHERE exercise_id = new.id;
+    END
+    """,
+]
+
+
+def upgrade():
+    with op.batch_alter_table('progress_entry', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('exercise_type', sa.String(length=100), nullable=True))
+
+    # Filled before indexing, so the index is built once
+    op.execute("""
+        UPDATE progress_entry SET exercise_type = (
+            SELECT exercise_type FROM exercise WHERE exercise.id = progress_entry.exercise_id
+        )
+    """)
+
+    with op.batch_alter_table('progress_entry', schema=None) as batch_op:
+        batch_op.create_index('ix_progress_entry_exercise_type_date_recorded_id', ['exercise_type', 'date_recorded', 'id'], unique=False)
+
+    with op.batch_alter_table('user_stats', schema=None) as batch_op:
+        batch_op.create_index('ix_user_stats_last_activity_at_user_id', ['last_activity_at', 'user_id'], unique=False)
+
+    for statement in TRIGGERS:
+        op.execute(statement)
+
+
+def downgrade():
+    for trigger in ('exercise_exercise_type_update', 'progress_entry_exercise_type_update',
+                    'progress_entry_exercise_type_insert'):
+        op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+
+    with op.batch_alter_table('user_stats', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_stats_last_activity_at_user_id')
+
+    with op.batch_alter_table('progress_entry', schema=None) as batch_op:
+        batch_op.drop_index('ix_progress_entry_exercise_type_date_recorded_id')
+        batch_op.drop_column('exercise_type')
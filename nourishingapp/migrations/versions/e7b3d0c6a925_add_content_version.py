@@ -0,0 +1,33 @@
+"""add content version counter
+
+Revision ID: e7b3d0c6a925
+Revises: c52a7e91f4b8
+Create Date: 2026-10-17 11:22:09.845102
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b3d0c6a925'
+down_revision = 'c52a7e91f4b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Older versions of app.py ran db.create_all() on import, which may have
+    # created the table before this migration got to run
+    if sa.inspect(op.get_bind()).has_table('content_version'):
+        return
+    content_version = op.create_table('content_version',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.bulk_insert(content_version, [{'id': 1, 'version': 0}])
+
+
+def downgrade():
+    op.drop_table('content_version')
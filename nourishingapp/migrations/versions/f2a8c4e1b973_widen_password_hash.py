@@ -0,0 +1,32 @@
+"""widen user.password_hash for configurable hash methods
+
+Revision ID: f2a8c4e1b973
+Revises: 9c6e1f7a3d52
+Create Date: 2026-10-17 16:31:27.094456
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a8c4e1b973'
+down_revision = '9c6e1f7a3d52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.alter_column('password_hash',
+               existing_type=sa.String(length=120),
+               type_=sa.String(length=255),
+               existing_nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.alter_column('password_hash',
+               existing_type=sa.String(length=255),
+               type_=sa.String(length=120),
+               existing_nullable=False)
@@ -0,0 +1,182 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+import multiprocessing
+import threading
+import time
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HasherBusy(Exception):
+    """Raised when too many hashing jobs are already queued."""
+
+
+class HasherTimeout(HasherBusy):
+    """Raised when a hashing job doesn't finish within the timeout."""
+
+
+def method_prefix(method):
+    """The parameters Werkzeug writes for method, e.g. 'scrypt:32768:8:1' for 'scrypt'."""
+    return generate_password_hash('', method).split('$', 1)[0]
+
+
+class PasswordHasher:
+    """Runs password hashing in a bounded process pool.
+
+    Hashing is deliberately slow; running it off the request threads keeps a
+    burst of logins from starving every other page. At most ``max_pending``
+    jobs may be queued or running; beyond that ``HasherBusy`` is raised at
+    once so the caller can answer 503 instead of piling up requests, and a
+    job that outlasts ``timeout`` raises its subclass ``HasherTimeout``.
+    ``workers=0`` hashes inline, which is handy for the shell and tests.
+    """
+
+    def __init__(self, method, workers=2, max_pending=32, timeout=10):
+        self.method = method
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._prefix = None
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._durations = deque(maxlen=1000)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        # Created on first use so importing the app never starts processes.
+        # Workers don't fork the app process: by now it runs other threads,
+        # whose locks a forked child would inherit held
+        with self._lock:
+            if self._executor is None:
+                start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context(start_method))
+                self._prefix = self._executor.submit(method_prefix, self.method)
+            return self._executor
+
+    def _submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HasherBusy('password hashing queue is full')
+        started = time.perf_counter()
+
+        def release(_future=None):
+            self._slots.release()
+            with self._lock:
+                self.completed += 1
+                self._durations.append(time.perf_counter() - started)
+
+        if not self.workers:
+            try:
+                return _Done(fn(*args))
+            finally:
+                release()
+        try:
+            future = self._pool().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(release)
+        return future
+
+    def _result(self, future):
+        try:
+            return future.result(self.timeout)
+        except FutureTimeoutError:
+            raise HasherTimeout('password hashing timed out') from None
+
+    def hash(self, password):
+        """Hash a password with the configured method."""
+        return self._result(self._submit(generate_password_hash, password, self.method))
+
+    def verify(self, password_hash, password):
+        """Check a password against a stored hash."""
+        return self._result(self._submit(check_password_hash, password_hash, password))
+
+    def needs_rehash(self, password_hash):
+        """True if the hash was made with different parameters than configured.
+
+        Werkzeug expands short forms ('scrypt', 'pbkdf2') to their full
+        parameters, so the configured method's are learned by hashing once in
+        the pool when it starts. Until that's done, nothing needs a rehash.
+        """
+        if self._prefix is None:
+            if self.workers:
+                self._pool()
+            else:
+                self._prefix = _Done(method_prefix(self.method))
+        prefix = self._prefix
+        if prefix is None or not prefix.done() or prefix.cancelled() or prefix.exception() is not None:
+            return False
+        return password_hash.split('$', 1)[0] != prefix.result()
+
+    def rehash_in_background(self, password, on_done):
+        """Hash password again and pass the new hash to on_done(new_hash).
+
+        Skipped silently when the queue is full; the next login retries.
+        on_done runs on a pool management thread, not the request thread.
+        """
+        try:
+            future = self._submit(generate_password_hash, password, self.method)
+        except HasherBusy:
+            return
+
+        def finished(future):
+            if future.exception() is None:
+                on_done(future.result())
+                with self._lock:
+                    self.rehashed += 1
+
+        future.add_done_callback(finished)
+
+    def stats(self):
+        with self._lock:
+            durations = sorted(self._durations)
+            stats = {
+                'method': self.method,
+                'workers': self.workers,
+                'max_pending': self.max_pending,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'rehashed': self.rehashed,
+            }
+
+        def percentile(p):
+            return round(durations[min(len(durations) - 1, int(p * len(durations)))] * 1000, 2)
+
+        if durations:
+            stats.update(p50_ms=percentile(0.5), p95_ms=percentile(0.95), p99_ms=percentile(0.99))
+        return stats
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+                self._prefix = None
+
+
+class _Done:
+    """Already-completed stand-in for a Future when hashing inline."""
+
+    def __init__(self, value):
+        self._value = value
+
+    def result(self, timeout=None):
+        return self._value
+
+    def done(self):
+        return True
+
+    def cancelled(self):
+        return False
+
+    def exception(self):
+        return None
+
+    def add_done_callback(self, fn):
+        fn(self)
@@ -0,0 +1,78 @@
+"""Exercise-video scoring from progress feedback, vectorized over users.
+
+A video's score blends two parts, both in 0..1:
+
+* affinity: how the user felt after exercises of the video's type, the
+  mean of their normalized performance and energy ratings, shrunk
+  towards a neutral 0.5 until they've logged a few entries of that type;
+* fit: how close the video's difficulty level is to a target level. The
+  target starts from the user's recovery stage and moves up when
+  exercise has been feeling easy and going well, down when it's been
+  hard. Advanced videos are never recommended in the early stage.
+
+``recommend`` takes per-user arrays and grouped feedback rows and returns
+the top-k video positions per user, so a whole batch of users is scored
+with a handful of array operations.
+"""
+import numpy as np
+
+LEVELS = {'Beginner': 0, 'Intermediate': 1, 'Advanced': 2}
+# Target difficulty level before any feedback, by recovery stage
+STAGE_TARGETS = {'Early': 0.0, 'Mid': 0.75, 'Late': 1.25}
+# Highest level recommended in each stage
+STAGE_MAX_LEVELS = {'Early': 1, 'Mid': 2, 'Late': 2}
+# Feedback entries that weigh as much as the neutral prior
+PRIOR_ENTRIES = 3
+AFFINITY_WEIGHT = 0.6
+
+
+def recommend(targets, max_levels, feedback, video_types, video_levels, top_k):
+    """(positions, scores, tried) arrays of shape (users, k), best first.
+
+    ``targets`` and ``max_levels`` come from STAGE_TARGETS/STAGE_MAX_LEVELS
+    for each user. ``feedback`` rows are (user position, type position,
+    entries, performance sum, energy sum, difficulty sum); type positions
+    not used by any video still count towards the difficulty target.
+    ``video_types`` and ``video_levels`` hold a type position and a LEVELS
+    value per video. ``tried`` marks recommendations of a type the user
+    has given feedback on. Ties go to the earlier video. Videos the
+    user's stage excludes score 0 and are only picked when fewer than k
+    others are left; callers should skip them.
+    """
+    targets = np.asarray(targets, dtype=float)
+    max_levels = np.asarray(max_levels, dtype=float)
+    video_types = np.asarray(video_types, dtype='int64')
+    video_levels = np.asarray(video_levels, dtype=float)
+    users, k = len(targets), min(top_k, len(video_types))
+    if not users or not k:
+        empty = np.zeros((users, 0))
+        return empty.astype('int64'), empty, empty.astype(bool)
+
+    rows = np.array(feedback, dtype=float).reshape(-1, 6)
+    user, kind = rows[:, 0].astype('int64'), rows[:, 1].astype('int64')
+    entries, performance, energy, difficulty = rows[:, 2], rows[:, 3], rows[:, 4], rows[:, 5]
+    types = int(max(video_types.max(), kind.max(initial=-1))) + 1
+
+    counts = np.zeros((users, types))
+    enjoyed = np.zeros((users, types))
+    np.add.at(counts, (user, kind), entries)
+    # Ratings rescaled to 0..1: performance is 1-5, energy 1-10
+    np.add.at(enjoyed, (user, kind), ((performance - entries) / 4 + (energy - entries) / 9) / 2)
+    affinity = (enjoyed + PRIOR_ENTRIES * 0.5) / (counts + PRIOR_ENTRIES)
+
+    total = counts.sum(axis=1)
+    felt = np.bincount(user, weights=difficulty, minlength=users)
+    rated = np.bincount(user, weights=performance, minlength=users)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # +1 when everything felt easiest (1/10) and went best (5/5), -1 at the other extreme
+        ease = np.where(total > 0, ((5.5 - felt / total) / 4.5 + (rated / total - 3) / 2) / 2, 0)
+    target = np.clip(targets + ease * total / (total + PRIOR_ENTRIES), 0, max_levels)
+
+    fit = 1 - np.abs(video_levels[None, :] - target[:, None]) / 2
+    scores = AFFINITY_WEIGHT * affinity[:, video_types] + (1 - AFFINITY_WEIGHT) * fit
+    scores[video_levels[None, :] > max_levels[:, None]] = 0
+
+    positions = np.argsort(-scores, axis=1, kind='stable')[:, :k]
+    picked = np.take_along_axis(scores, positions, axis=1)
+    tried = np.take_along_axis(counts[:, video_types] > 0, positions, axis=1)
+    return positions, picked, tried
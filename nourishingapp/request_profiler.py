@@ -0,0 +1,139 @@
+from collections import Counter, deque
+import re
+import threading
+import time
+
+# Upper bounds (ms) of the request duration histogram buckets; the last one is open-ended
+HISTOGRAM_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+_WHITESPACE = re.compile(r'\s+')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+
+
+def normalize_statement(statement):
+    """Collapse whitespace and IN (?, ?, ...) lists so one query shape has one key."""
+    return _PLACEHOLDER_LIST.sub('(?...)', _WHITESPACE.sub(' ', statement).strip())
+
+
+class RequestProfile:
+    """SQL statements run while serving one request."""
+    __slots__ = ('started', 'statements')
+
+    def __init__(self, started):
+        self.started = started
+        self.statements = []  # (statement, seconds)
+
+    def record(self, statement, seconds):
+        self.statements.append((statement, seconds))
+
+
+class _EndpointStats:
+    def __init__(self, window):
+        self.requests = 0
+        self.durations = deque(maxlen=window)
+        self.db_times = deque(maxlen=window)
+        self.queries = deque(maxlen=window)
+        self.slowest = {}  # normalized statement -> worst seconds seen
+        self.repeated = {}  # normalized statement -> [requests flagged, most repeats in one request]
+
+
+class RequestProfiler:
+    """Per-endpoint request timing and SQL statistics over a rolling window.
+
+    Each request's statements are collected into a ``RequestProfile`` and
+    folded into its endpoint's stats when the request finishes: the last
+    ``window`` durations, DB times and query counts, the slowest statement
+    shapes, and statements repeated ``repeat_threshold`` or more times in one
+    request, which is what an N+1 lazy load looks like.
+    """
+
+    def __init__(self, window=500, slow_statements=10, repeat_threshold=3, clock=time.perf_counter):
+        self.window = window
+        self.slow_statements = slow_statements
+        self.repeat_threshold = repeat_threshold
+        self._clock = clock
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def begin(self):
+        return RequestProfile(self._clock())
+
+    def finish(self, endpoint, profile):
+        """Record a finished request; returns (total seconds, DB seconds, query count)."""
+        total = self._clock() - profile.started
+        db_time = sum(seconds for _, seconds in profile.statements)
+        shapes = [(normalize_statement(statement), seconds) for statement, seconds in profile.statements]
+        repeats = Counter(shape for shape, _ in shapes)
+
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = _EndpointStats(self.window)
+            stats.requests += 1
+            stats.durations.append(total)
+            stats.db_times.append(db_time)
+            stats.queries.append(len(shapes))
+            for shape, seconds in shapes:
+                if seconds > stats.slowest.get(shape, 0):
+                    stats.slowest[shape] = seconds
+            if len(stats.slowest) > 4 * self.slow_statements:
+                keep = sorted(stats.slowest.items(), key=lambda item: item[1], reverse=True)
+                stats.slowest = dict(keep[:self.slow_statements])
+            for shape, count in repeats.items():
+                if count >= self.repeat_threshold:
+                    entry = stats.repeated.setdefault(shape, [0, 0])
+                    entry[0] += 1
+                    entry[1] = max(entry[1], count)
+        return total, db_time, len(shapes)
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+    def stats(self):
+        with self._lock:
+            snapshot = {endpoint: (stats.requests, sorted(stats.durations), sorted(stats.db_times),
+                                   list(stats.queries), dict(stats.slowest),
+                                   {shape: list(entry) for shape, entry in stats.repeated.items()})
+                        for endpoint, stats in self._endpoints.items()}
+
+        def percentile(values, p):
+            return round(values[min(len(values) - 1, int(p * len(values)))] * 1000, 2)
+
+        endpoints = {}
+        for endpoint, (requests, durations, db_times, queries, slowest, repeated) in snapshot.items():
+            histogram = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+            for seconds in durations:
+                index = 0
+                while index < len(HISTOGRAM_BUCKETS_MS) and seconds * 1000 > HISTOGRAM_BUCKETS_MS[index]:
+                    index += 1
+                histogram[index] += 1
+            endpoints[endpoint] = {
+                'requests': requests,
+                'p50_ms': percentile(durations, 0.5),
+                'p95_ms': percentile(durations, 0.95),
+                'p99_ms': percentile(durations, 0.99),
+                'db_mean_ms': round(sum(db_times) / len(db_times) * 1000, 2),
+                'db_p95_ms': percentile(db_times, 0.95),
+                'queries_mean': round(sum(queries) / len(queries), 2),
+                'queries_max': max(queries),
+                'histogram': dict(zip([f'<={bound}ms' for bound in HISTOGRAM_BUCKETS_MS] +
+                                      [f'>{HISTOGRAM_BUCKETS_MS[-1]}ms'], histogram)),
+                'slowest': [{'statement': shape, 'ms': round(seconds * 1000, 2)}
+                            for shape, seconds in sorted(slowest.items(), key=lambda item: item[1],
+                                                         reverse=True)[:self.slow_statements]],
+                'repeated': [{'statement': shape, 'requests': flagged, 'max_repeats': most}
+                             for shape, (flagged, most) in sorted(repeated.items(), key=lambda item: item[1],
+                                                                  reverse=True)],
+            }
+        return {
+            'window': self.window,
+            'repeat_threshold': self.repeat_threshold,
+            'endpoints': dict(sorted(endpoints.items(), key=lambda item: item[1]['p95_ms'], reverse=True)),
+        }
+
+
+def server_timing(total, db_time, queries):
+    """Server-Timing header value for one request."""
+    return (f'db;dur={db_time * 1000:.1f};desc="{queries} queries", '
+            f'app;dur={(total - db_time) * 1000:.1f}, total;dur={total * 1000:.1f}')
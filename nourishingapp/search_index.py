@@ -0,0 +1,188 @@
+"""Full-text search over the content tables with an SQLite FTS5 index.
+
+The ``content_search`` FTS5 table indexes the title, body and tags
+(category, mood, exercise type) of every active tip, mental tip, recovery
+tip, wellness resource and exercise video; ``content_search_facet`` holds
+each entry's category and difficulty. Triggers on the source tables keep
+both current however a row is written: Flask-Admin, ``flask seed`` or bulk
+inserts. An entry's id is ``source id * 8 + kind code``, so the triggers
+find it without scanning, and the kind never has to be stored.
+"""
+import html
+import re
+
+from sqlalchemy import text
+
+TABLE = 'content_search'
+FACET_TABLE = 'content_search_facet'
+# Column weights for bm25(): title, body, tags
+WEIGHTS = (8.0, 1.0, 4.0)
+MAX_TERMS = 8
+# Shorter words only match whole words; as prefixes they'd match most of the index
+MIN_PREFIX_LENGTH = 3
+ROWID_KINDS = 8
+
+# kind -> (code, source table, title, body, tags, category, difficulty, active); {row} is the row alias
+SOURCES = {
+    'tip': (1, 'tip', '{row}.title', '{row}.content', '{row}.category', '{row}.category', 'NULL',
+            'coalesce({row}.is_active, 1)'),
+    'mental_tip': (2, 'mental_tip', "'Month ' || {row}.month_relation", '{row}.tip_content',
+                   "'Month ' || {row}.month_relation", "'Month ' || {row}.month_relation", 'NULL', '1'),
+    'recovery_tip': (3, 'recovery_tip', '{row}.title', '{row}.content', '{row}.recovery_stage',
+                     '{row}.recovery_stage', 'NULL', 'coalesce({row}.is_active, 1)'),
+    'resource': (4, 'mental_wellness_resource', '{row}.title', '{row}.content',
+                 "{row}.resource_type || ' ' || coalesce({row}.mood_category, '')", '{row}.resource_type',
+                 'NULL', 'coalesce({row}.is_active, 1)'),
+    'exercise_video': (5, 'exercise_video', '{row}.title', "coalesce({row}.description, '')",
+                       '{row}.exercise_type', '{row}.exercise_type', '{row}.difficulty_level',
+                       'coalesce({row}.is_active, 1)'),
+}
+FACETS = ('kind', 'category', 'difficulty')
+KIND_CODES = {kind: source[0] for kind, source in SOURCES.items()}
+KINDS = {code: kind for kind, code in KIND_CODES.items()}
+
+_WORD = re.compile(r'\w+')
+
+
+def _inserts(kind, row, source=''):
+    """Statements indexing the active rows of one kind; ``row`` is ``new`` in triggers."""
+    code, _, title, body, tags, category, difficulty, active = (
+        part.format(row=row) if isinstance(part, str) else part for part in SOURCES[kind])
+    entry_id = f'{row}.id * {ROWID_KINDS} + {code}'
+    return [
+        f'INSERT INTO {TABLE} (rowid, title, body, tags) '
+        f'SELECT {entry_id}, {title}, {body}, {tags}{source} WHERE {active}',
+        f'INSERT INTO {FACET_TABLE} (id, category, difficulty) '
+        f'SELECT {entry_id}, {category}, {difficulty}{source} WHERE {active}',
+    ]
+
+
+def create_statements():
+    statements = [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5(title, body, tags, "
+        f"tokenize='porter unicode61 remove_diacritics 2', prefix='3')",
+        # Stored in the index's config, so ORDER BY rank uses the column weights
+        f"INSERT INTO {TABLE} ({TABLE}, rank) VALUES ('rank', 'bm25({', '.join(map(str, WEIGHTS))})')",
+        # A plain table: counting facets over thousands of matches is much
+        # cheaper here than through FTS5's stored columns
+        f'CREATE TABLE IF NOT EXISTS {FACET_TABLE} (id INTEGER PRIMARY KEY, category TEXT, difficulty TEXT)',
+    ]
+    for kind, (code, table, *_) in SOURCES.items():
+        entry_id = f'old.id * {ROWID_KINDS} + {code}'
+        deletes = [f'DELETE FROM {TABLE} WHERE rowid = {entry_id}',
+                   f'DELETE FROM {FACET_TABLE} WHERE id = {entry_id}']
+        statements += [
+            f'CREATE TRIGGER IF NOT EXISTS {TABLE}_{table}_insert AFTER INSERT ON {table} '
+            f'BEGIN {"; ".join(_inserts(kind, "new"))}; END',
+            f'CREATE TRIGGER IF NOT EXISTS {TABLE}_{table}_update AFTER UPDATE ON {table} '
+            f'BEGIN {"; ".join(deletes + _inserts(kind, "new"))}; END',
+            f'CREATE TRIGGER IF NOT EXISTS {TABLE}_{table}_delete AFTER DELETE ON {table} '
+            f'BEGIN {"; ".join(deletes)}; END',
+        ]
+    return statements
+
+
+def create_index(connection):
+    """Create the index tables and their triggers if they don't exist yet."""
+    for statement in create_statements():
+        connection.execute(text(statement))
+
+
+def drop_index(connection):
+    for kind, (code, table, *_) in SOURCES.items():
+        for event in ('insert', 'update', 'delete'):
+            connection.execute(text(f'DROP TRIGGER IF EXISTS {TABLE}_{table}_{event}'))
+    connection.execute(text(f'DROP TABLE IF EXISTS {FACET_TABLE}'))
+    connection.execute(text(f'DROP TABLE IF EXISTS {TABLE}'))
+
+
+def rebuild_index(connection):
+    """Re-index every active content row; returns the number indexed."""
+    create_index(connection)
+    connection.execute(text(f'DELETE FROM {TABLE}'))
+    connection.execute(text(f'DELETE FROM {FACET_TABLE}'))
+    for kind, (code, table, *_) in SOURCES.items():
+        for statement in _inserts(kind, table, f' FROM {table}'):
+            connection.execute(text(statement))
+    connection.execute(text(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')"))
+    return connection.execute(text(f'SELECT count(*) FROM {FACET_TABLE}')).scalar()
+
+
+def include_name(name, type_, parent_names):
+    """Keep the index tables (and FTS5's shadow tables) out of Alembic autogenerate."""
+    return not (type_ == 'table' and name.startswith(TABLE))
+
+
+def match_expression(query):
+    """FTS5 query for free text: every word must match.
+
+    Words of MIN_PREFIX_LENGTH or more characters also match as prefixes.
+    Words are quoted, so FTS5 operators and punctuation in the input are
+    taken literally. None if the input has no words.
+    """
+    words = _WORD.findall(query.lower())[:MAX_TERMS]
+    return ' '.join(f'"{word}"*' if len(word) >= MIN_PREFIX_LENGTH else f'"{word}"'
+                    for word in words) or None
+
+
+def _highlight(snippet):
+    return html.escape(snippet).replace('\x02', '<mark>').replace('\x03', '</mark>')
+
+
+def search(connection, query, filters=None, limit=20, offset=0):
+    """Ranked matches for a free-text query plus facet counts.
+
+    ``filters`` restricts the results to the given kind/category/difficulty.
+    Facet counts cover every match regardless of filters, so each facet
+    shows what choosing it would return; ``total`` counts the filtered
+    matches. Snippets are HTML with the matched words in <mark>.
+
+    Every match is scored, so the cost grows with the number of matches:
+    a few ms for a few thousand, tens of ms for a word found in most of a
+    large index.
+    """
+    expression = match_expression(query)
+    result = {'query': query, 'total': 0, 'results': [], 'facets': {facet: {} for facet in FACETS}}
+    if expression is None:
+        return result
+    filters = {facet: value for facet, value in (filters or {}).items() if facet in FACETS and value}
+
+    groups = connection.execute(text(
+        f'SELECT {TABLE}.rowid % {ROWID_KINDS}, f.category, f.difficulty, count(*) '
+        f'FROM {TABLE} JOIN {FACET_TABLE} f ON f.id = {TABLE}.rowid '
+        f'WHERE {TABLE} MATCH :match GROUP BY 1, 2, 3'), {'match': expression}).all()
+    for code, category, difficulty, count in groups:
+        values = {'kind': KINDS[code], 'category': category, 'difficulty': difficulty}
+        for facet, value in values.items():
+            if value is not None:
+                result['facets'][facet][value] = result['facets'][facet].get(value, 0) + count
+        if all(values[facet] == value for facet, value in filters.items()):
+            result['total'] += count
+    for facet, counts in result['facets'].items():
+        result['facets'][facet] = dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+
+    if not result['total'] or offset >= result['total']:
+        return result
+    parameters = dict(filters, match=expression, limit=limit, offset=offset)
+    conditions = ''
+    for facet in filters:
+        if facet == 'kind':
+            conditions += f' AND {TABLE}.rowid % {ROWID_KINDS} = :kind'
+            parameters['kind'] = KIND_CODES.get(filters['kind'], 0)
+        else:
+            conditions += f' AND f.{facet} = :{facet}'
+    rows = connection.execute(text(
+        f'SELECT {TABLE}.rowid, f.category, f.difficulty, {TABLE}.title, '
+        f"snippet({TABLE}, 1, char(2), char(3), '…', 24) AS snippet, {TABLE}.rank "
+        f'FROM {TABLE} JOIN {FACET_TABLE} f ON f.id = {TABLE}.rowid '
+        f'WHERE {TABLE} MATCH :match{conditions} ORDER BY {TABLE}.rank LIMIT :limit OFFSET :offset'),
+        parameters).all()
+    return dict(result, results=[{
+        'kind': KINDS[row.rowid % ROWID_KINDS],
+        'id': row.rowid // ROWID_KINDS,
+        'title': row.title,
+        'snippet': _highlight(row.snippet),
+        'category': row.category,
+        'difficulty': row.difficulty,
+        'score': round(-row.rank, 3),
+    } for row in rows])
@@ -0,0 +1,128 @@
+"""Vectorized mood/stress/sleep trends over wellness check-ins.
+
+Every function takes parallel NumPy arrays, one element per entry: ``days``
+(whole days since 1970-01-01), ``mood`` and ``stress`` ratings and
+``sleep`` hours (NaN where not recorded). Results are plain lists and
+dicts, ready for JSON; averages with nothing to average are None.
+"""
+import numpy as np
+
+METRICS = ('mood', 'stress', 'sleep')
+
+
+def entry_arrays(rows, width):
+    """Split rows of ``width`` numeric columns (None allowed) into float arrays."""
+    columns = np.array(rows, dtype=float).reshape(-1, width)
+    return [columns[:, i] for i in range(width)]
+
+
+def _json(values, digits=2):
+    return [None if np.isnan(value) else round(float(value), digits) for value in values]
+
+
+def _dates(days):
+    return np.asarray(days, dtype='int64').astype('datetime64[D]').astype(str).tolist()
+
+
+def _group_sums(index, size, values):
+    """Per-group (sum, count) of values, skipping NaN."""
+    valid = ~np.isnan(values)
+    return (np.bincount(index[valid], weights=values[valid], minlength=size),
+            np.bincount(index[valid], minlength=size))
+
+
+def _mean(sums, counts):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+def bucket_means(keys, metrics):
+    """Entry count and per-metric means for each distinct key, in key order."""
+    unique, index = np.unique(keys, return_inverse=True)
+    result = {'entries': np.bincount(index, minlength=len(unique)).tolist()}
+    for name, values in metrics.items():
+        result[name] = _json(_mean(*_group_sums(index, len(unique), values)))
+    return unique, result
+
+
+def rolling_means(days, metrics, window):
+    """Trailing ``window``-day means for every day from the first entry to the last.
+
+    Days without entries still get a value as long as the window reaches
+    back to one; sums and counts come from cumulative sums, so the cost
+    doesn't depend on the window length.
+    """
+    first = int(days.min())
+    span = int(days.max()) - first + 1
+    offset = (days - first).astype('int64')
+    end = np.arange(1, span + 1)
+    start = np.maximum(end - window, 0)
+    result = {'window': window, 'dates': _dates(np.arange(first, first + span))}
+    for name, values in metrics.items():
+        sums, counts = _group_sums(offset, span, values)
+        total = np.concatenate(([0.0], np.cumsum(sums)))
+        seen = np.concatenate(([0], np.cumsum(counts)))
+        result[name] = _json(_mean(total[end] - total[start], seen[end] - seen[start]))
+    return result
+
+
+def grouped_correlation(index, size, x, y):
+    """Pearson correlation of x and y within each group, skipping NaN pairs.
+
+    None where a group has fewer than three pairs or no variance.
+    """
+    valid = ~(np.isnan(x) | np.isnan(y))
+    index, x, y = index[valid], x[valid], y[valid]
+    n = np.bincount(index, minlength=size).astype(float)
+
+    def total(weights):
+        return np.bincount(index, weights=weights, minlength=size)
+
+    sx, sy = total(x), total(y)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r = (n * total(x * y) - sx * sy) / np.sqrt((n * total(x * x) - sx ** 2) * (n * total(y * y) - sy ** 2))
+    return np.where((n >= 3) & np.isfinite(r), np.clip(r, -1, 1), np.nan)
+
+
+def trends(days, mood, stress, sleep, window=7):
+    """Daily, weekly (Monday-start) and monthly means, rolling means and sleep-mood correlation."""
+    if not len(days):
+        return {'entries': 0}
+    days = days.astype('int64')
+    metrics = dict(zip(METRICS, (mood, stress, sleep)))
+
+    daily_keys, daily = bucket_means(days, metrics)
+    # 1970-01-01 was a Thursday, so Monday-start weeks begin 3 days before each multiple of 7
+    week_keys, weekly = bucket_means((days + 3) // 7 * 7 - 3, metrics)
+    month_keys, monthly = bucket_means(days.astype('datetime64[D]').astype('datetime64[M]').astype('int64'),
+                                       metrics)
+
+    correlation = grouped_correlation(np.zeros(len(days), dtype='int64'), 1, sleep, mood)
+    return {
+        'entries': int(len(days)),
+        'first_date': _dates([days.min()])[0],
+        'last_date': _dates([days.max()])[0],
+        'daily': dict(dates=_dates(daily_keys), **daily),
+        'weekly': dict(week_starts=_dates(week_keys), **weekly),
+        'monthly': dict(months=month_keys.astype('datetime64[M]').astype(str).tolist(), **monthly),
+        'rolling': rolling_means(days, metrics, window),
+        'sleep_mood_correlation': _json(correlation, 3)[0],
+    }
+
+
+def cohorts(groups, user_ids, mood, stress, sleep):
+    """Per-group user and entry counts, metric means and sleep-mood correlation."""
+    if not len(groups):
+        return []
+    keys, index = np.unique(groups.astype('int64'), return_inverse=True)
+    size = len(keys)
+    users = np.unique(np.stack([index, user_ids.astype('int64')]), axis=1)[0]
+    result = {
+        'entries': np.bincount(index, minlength=size).tolist(),
+        'users': np.bincount(users, minlength=size).tolist(),
+        'sleep_mood_correlation': _json(grouped_correlation(index, size, sleep, mood), 3),
+    }
+    for name, values in zip(METRICS, (mood, stress, sleep)):
+        result[name] = _json(_mean(*_group_sums(index, size, values)))
+    return [dict({'group': int(key)}, **{name: column[i] for name, column in result.items()})
+            for i, key in enumerate(keys)]